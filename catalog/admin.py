@@ -1,12 +1,95 @@
 from django.contrib import admin
-from catalog.models import Product, Category, Version
+from django.template.response import TemplateResponse
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Q
+
+from catalog.forms import VersionAdminForm
+from catalog.models import Product, Category, Version, BannedWord
+from catalog.pagination import EstimatedCountPaginator
+from catalog.services import clear_actual_versions, bulk_update_products, touch_products
+
+
+class ProductAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр по продукту с автодополнением.
+
+    Вместо списка всех продуктов в боковой панели выводится поле select2,
+    которое ищет продукты через autocomplete-представление админки.
+    """
+    title = 'Продукт'
+    parameter_name = 'product'
+    template = 'admin/catalog/autocomplete_filter.html'
+
+    def lookups(self, request, model_admin):
+        if self.value():
+            product = Product.objects.filter(pk=self.value()).only('name').first()
+            if product:
+                return ((self.value(), product.name),)
+        # Фильтр выводится, только если lookups не пустой
+        return (('', ''),)
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(product_id=self.value())
+        return queryset
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'price', 'category',)
-    list_filter = ('category',)
+    list_filter = ('category', 'is_active')
     search_fields = ('name', 'description',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('activate', 'deactivate', 'move_to_category')
+
+    # Действия работают и для "выбрать все" по фильтру: выборка изменяется пачками UPDATE
+    # через bulk_update_products, кеши сбрасываются один раз на пачку
+
+    @admin.action(description='Опубликовать', permissions=['edit_is_active'])
+    def activate(self, request, queryset):
+        updated = bulk_update_products(queryset, is_active=True)
+        self.message_user(request, f'Опубликовано товаров: {updated}')
+
+    @admin.action(description='Снять с публикации', permissions=['edit_is_active'])
+    def deactivate(self, request, queryset):
+        updated = bulk_update_products(queryset, is_active=False)
+        self.message_user(request, f'Снято с публикации товаров: {updated}')
+
+    @admin.action(description='Перенести в категорию', permissions=['edit_category'])
+    def move_to_category(self, request, queryset):
+        """Показывает страницу выбора категории, после подтверждения переносит выборку"""
+        category = Category.objects.filter(pk=request.POST.get('category') or None).first()
+        if 'apply' in request.POST and category is not None:
+            updated = bulk_update_products(queryset, category=category)
+            self.message_user(request, f'Перенесено в категорию "{category.name}" товаров: {updated}')
+            return None
+        return TemplateResponse(request, 'admin/catalog/product/move_to_category.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Перенос товаров в категорию',
+            'categories': Category.objects.order_by('name').only('name'),
+            'selected': request.POST.getlist(admin.helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    def has_edit_is_active_permission(self, request):
+        return request.user.has_perm('catalog.can_edit_is_active')
+
+    def has_edit_category_permission(self, request):
+        return request.user.has_perm('catalog.can_edit_category')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Полнотекстовый поиск по search_vector вместо ILIKE по name и description.
+        Частичные совпадения в названии (в том числе для автодополнения) ищутся по триграммному индексу.
+        """
+        if not search_term:
+            return queryset, False
+        query = SearchQuery(search_term, config='russian', search_type='websearch')
+        return queryset.filter(Q(search_vector=query) | Q(name__icontains=search_term)), False
 
 
 @admin.register(Category)
@@ -14,11 +97,46 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ('id', 'name',)
     search_fields = ('name',)
     ordering = ('name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Version)
 class VersionAdmin(admin.ModelAdmin):
+    form = VersionAdminForm
     list_display = ('id', 'product', 'version_number',)
-    list_filter = ('product', 'version_number')
-    search_fields = ('version_number',)
+    list_filter = (ProductAutocompleteFilter, 'version_number')
+    list_select_related = ('product',)
+    search_fields = ('name', 'version_number', 'product__name',)
     ordering = ('version_number',)
+    autocomplete_fields = ('product',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    class Media:
+        css = {'all': ('admin/css/vendor/select2/select2.min.css', 'admin/css/autocomplete.css')}
+        js = ('admin/js/vendor/jquery/jquery.min.js', 'admin/js/vendor/select2/select2.full.min.js',
+              'admin/js/jquery.init.js', 'admin/js/autocomplete.js')
+
+    def save_model(self, request, obj, form, change):
+        """Новая актуальная версия заменяет предыдущую актуальную версию товара"""
+        if obj.is_actual:
+            clear_actual_versions(obj.product_id, exclude_pk=obj.pk)
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        touch_products([obj.product_id])
+
+    def delete_queryset(self, request, queryset):
+        """Удаляет выбранные версии и отмечает их товары измененными одним запросом"""
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        super().delete_queryset(request, queryset)
+        touch_products(product_ids)
+
+
+@admin.register(BannedWord)
+class BannedWordAdmin(admin.ModelAdmin):
+    list_display = ('id', 'word', 'is_active',)
+    list_filter = ('is_active',)
+    search_fields = ('word',)
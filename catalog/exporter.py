@@ -0,0 +1,97 @@
+import csv
+import json
+import zlib
+
+from django.db.models import Prefetch
+
+from catalog.models import Product, Version
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = ('id', 'name', 'description', 'price', 'is_active', 'created_at', 'category', 'owner_email',
+                 'versions')
+
+
+def get_export_queryset():
+    """Товары с категорией и email владельца в одном запросе, версии подгружаются отдельно"""
+    versions = Version.objects.only('product_id', 'name', 'version_number', 'is_actual').order_by('version_number')
+    return (Product.objects.select_related('category', 'owner')
+            .only('name', 'description', 'price', 'is_active', 'created_at', 'category__name', 'owner__email')
+            .prefetch_related(Prefetch('versions', queryset=versions))
+            .order_by('pk'))
+
+
+def iter_export_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Отдает товары каталога словарями по одному.
+
+    iterator(chunk_size) читает товары серверным курсором по chunk_size строк,
+    версии подгружаются одним запросом на каждую пачку, поэтому в памяти не больше одной пачки.
+    """
+    for product in get_export_queryset().iterator(chunk_size=chunk_size):
+        yield {
+            'id': product.pk,
+            'name': product.name,
+            'description': product.description,
+            'price': str(product.price),
+            'is_active': product.is_active,
+            'created_at': product.created_at.isoformat(),
+            'category': product.category.name,
+            'owner_email': product.owner.email if product.owner else None,
+            'versions': [
+                {'name': version.name, 'version_number': version.version_number, 'is_actual': version.is_actual}
+                for version in product.versions.all()
+            ],
+        }
+
+
+class Echo:
+    """Объект с интерфейсом файла для csv.writer: возвращает записанную строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Строки CSV; версии записываются в одну ячейку как 'имя (номер)' через '; ', актуальная отмечена '*'"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['versions'] = '; '.join(
+            f"{version['name']} ({version['version_number']}){'*' if version['is_actual'] else ''}"
+            for version in row['versions']
+        )
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def iter_jsonl(rows):
+    """Строки JSON Lines: один товар - один JSON-объект"""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def iter_gzip(lines, flush_size=64 * 1024):
+    """Сжимает поток строк в gzip, отдавая сжатые данные по мере накопления flush_size байт"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    pending = []
+    size = 0
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            pending.append(data)
+            size += len(data)
+        if size >= flush_size:
+            yield b''.join(pending)
+            pending = []
+            size = 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+
+def iter_export(export_format, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Поток выгрузки каталога в формате 'csv' или 'jsonl', при compress - сжатый gzip"""
+    rows = iter_export_rows(chunk_size)
+    lines = iter_csv(rows) if export_format == 'csv' else iter_jsonl(rows)
+    if compress:
+        return iter_gzip(lines)
+    return (line.encode() for line in lines)
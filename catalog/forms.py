@@ -1,6 +1,11 @@
-from django.forms import ModelForm, BooleanField, forms
+from django.core.exceptions import ValidationError
+from django.forms import ModelForm, BooleanField, BaseInlineFormSet, forms, ModelChoiceField, TypedChoiceField, \
+    CharField, NullBooleanField, ChoiceField
+from django.utils.functional import cached_property
 
-from catalog.models import Product, Version
+from catalog.models import Product, Version, Category, PRICE_BUCKETS, get_price_bucket_range
+from catalog.moderation import find_banned_words
+from catalog.services import get_price_bucket_label
 
 
 class StyleFormMixin:
@@ -15,9 +20,16 @@ class StyleFormMixin:
                 field.widget.attrs['class'] = 'form-control'
 
 
+def check_banned_words(text):
+    """Проверка на наличие запрещенных слов (список хранится в модели BannedWord)"""
+    words = find_banned_words(text)
+    if words:
+        raise forms.ValidationError('Нельзя использовать слова: ' + ', '.join(f'"{word}"' for word in words))
+    return text
+
+
 class ProductForm(StyleFormMixin, ModelForm):
     """Форма для создания товара"""
-    banned_words = ['казино', 'криптовалюта', 'крипта', 'биржа', 'дешево', 'бесплатно', 'обман', 'полиция', 'радар']
 
     class Meta:
         model = Product
@@ -27,19 +39,11 @@ class ProductForm(StyleFormMixin, ModelForm):
 
     def clean_name(self):
         """Проверка на наличие запрещенных слов"""
-        clean_name = self.cleaned_data['name']
-        for word in self.banned_words:
-            if word in clean_name.lower():
-                raise forms.ValidationError(f'Нельзя использовать слово "{word}"')
-        return clean_name
+        return check_banned_words(self.cleaned_data['name'])
 
     def clean_description(self):
         """Проверка на наличие запрещенных слов"""
-        clean_description = self.cleaned_data['description']
-        for word in self.banned_words:
-            if word in clean_description.lower():
-                raise forms.ValidationError(f'Нельзя использовать слово "{word}"')
-        return clean_description
+        return check_banned_words(self.cleaned_data['description'])
 
 
 class ProductModeratorForm(StyleFormMixin, ModelForm):
@@ -49,9 +53,125 @@ class ProductModeratorForm(StyleFormMixin, ModelForm):
         fields = ('category', 'description', 'is_active')
 
 
+class BulkModerationForm(StyleFormMixin, forms.Form):
+    """Форма массовой модерации: фильтр выборки товаров и действие над ней"""
+    ACTIONS = (
+        ('activate', 'Опубликовать'),
+        ('deactivate', 'Снять с публикации'),
+        ('move', 'Перенести в категорию'),
+    )
+    # Право, необходимое для каждого действия
+    ACTION_PERMISSIONS = {
+        'activate': 'catalog.can_edit_is_active',
+        'deactivate': 'catalog.can_edit_is_active',
+        'move': 'catalog.can_edit_category',
+    }
+
+    category = ModelChoiceField(Category.objects.all(), required=False, label='Категория')
+    price = TypedChoiceField(choices=[('', 'Любая')] + [(bucket, get_price_bucket_label(bucket))
+                                                       for bucket in range(len(PRICE_BUCKETS) + 1)],
+                             coerce=int, empty_value=None, required=False, label='Цена')
+    name = CharField(required=False, label='Название содержит')
+    is_active = NullBooleanField(required=False, label='Опубликован')
+    action = ChoiceField(choices=ACTIONS, label='Действие')
+    target_category = ModelChoiceField(Category.objects.all(), required=False, label='Новая категория')
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action and self.user is not None and not self.user.has_perm(self.ACTION_PERMISSIONS[action]):
+            raise ValidationError('Недостаточно прав для этого действия')
+        if action == 'move' and not cleaned_data.get('target_category'):
+            self.add_error('target_category', 'Выберите категорию')
+        return cleaned_data
+
+    def get_queryset(self):
+        """Выборка товаров по фильтрам формы"""
+        queryset = Product.objects.all()
+        if self.cleaned_data['category']:
+            queryset = queryset.filter(category=self.cleaned_data['category'])
+        if self.cleaned_data['price'] is not None:
+            low, high = get_price_bucket_range(self.cleaned_data['price'])
+            if low is not None:
+                queryset = queryset.filter(price__gte=low)
+            if high is not None:
+                queryset = queryset.filter(price__lt=high)
+        if self.cleaned_data['name']:
+            queryset = queryset.filter(name__icontains=self.cleaned_data['name'])
+        if self.cleaned_data['is_active'] is not None:
+            queryset = queryset.filter(is_active=self.cleaned_data['is_active'])
+        return queryset
+
+    def get_values(self):
+        """Значения полей, которые устанавливает выбранное действие"""
+        action = self.cleaned_data['action']
+        if action == 'move':
+            return {'category': self.cleaned_data['target_category']}
+        return {'is_active': action == 'activate'}
+
+
 class VersionForm(StyleFormMixin, ModelForm):
     """Форма для создания версии товара"""
 
     class Meta:
         model = Version
         fields = '__all__'
+
+
+class VersionAdminForm(ModelForm):
+    """
+    Форма версии в админке.
+
+    Ограничение version_one_actual_per_product форма не проверяет: новая актуальная версия
+    заменяет прежнюю, с которой VersionAdmin.save_model снимает признак перед сохранением.
+    """
+
+    class Meta:
+        model = Version
+        fields = '__all__'
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        exclude.add('is_actual')
+        return exclude
+
+
+class BaseVersionFormSet(BaseInlineFormSet):
+    """
+    Набор форм версий товара.
+
+    Стандартное скрытое поле id проверяет каждую форму отдельным запросом queryset.get(pk=...);
+    здесь версии ищутся среди уже загруженных набором форм, поэтому проверка
+    сотни версий не добавляет запросов.
+    """
+
+    @cached_property
+    def objects_by_pk(self):
+        return {str(obj.pk): obj for obj in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_field = form.fields[self._pk_field.name]
+
+        def to_python(value):
+            if value in pk_field.empty_values:
+                return None
+            obj = self.objects_by_pk.get(str(value))
+            if obj is None:
+                raise ValidationError(pk_field.error_messages['invalid_choice'], code='invalid_choice',
+                                      params={'value': value})
+            return obj
+
+        pk_field.to_python = to_python
+
+    def clean(self):
+        """Актуальной может быть только одна версия товара"""
+        super().clean()
+        actual = [form for form in self.forms
+                  if form.cleaned_data.get('is_actual') and not form.cleaned_data.get('DELETE')]
+        if len(actual) > 1:
+            raise ValidationError('Актуальной может быть только одна версия')
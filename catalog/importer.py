@@ -0,0 +1,114 @@
+import json
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from catalog.models import Category, Product
+
+FIXTURE_ENCODING = 'utf-16'
+READ_CHUNK_SIZE = 64 * 1024
+IMPORT_BATCH_SIZE = 2000
+# Разделители между объектами верхнего уровня массива фикстуры
+SEPARATORS = ' \t\r\n,['
+
+
+def iter_fixture(path, encoding=FIXTURE_ENCODING, chunk_size=READ_CHUNK_SIZE):
+    """
+    Читает фикстуру (JSON-массив объектов) по одному объекту, не загружая файл целиком.
+
+    Файл читается кусками по chunk_size символов, очередной объект разбирается
+    JSONDecoder.raw_decode, как только он полностью оказался в буфере.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with open(path, encoding=encoding) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer += chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in SEPARATORS:
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                if buffer[pos] == ']':
+                    return
+                try:
+                    obj, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    # Объект еще не дочитан - дочитываем следующий кусок файла
+                    break
+                yield obj
+            buffer = buffer[pos:]
+            if not chunk:
+                return
+
+
+def iter_batches(iterable, batch_size):
+    """Разбивает поток объектов на списки длиной не больше batch_size"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def build_category(record):
+    fields = record['fields']
+    return Category(id=record['pk'], name=fields['name'], description=fields.get('description'))
+
+
+# Поля товара, которые берутся из фикстуры; внешние ключи задаются по id без запросов к базе
+PRODUCT_FIXTURE_FIELDS = {'name': 'name', 'description': 'description', 'image': 'image',
+                          'category': 'category_id', 'price': 'price', 'owner': 'owner_id',
+                          'is_active': 'is_active', 'created_at': 'created_at'}
+
+
+def build_product(record):
+    """Задает только поля, которые есть в записи фикстуры, остальные получают значения по умолчанию"""
+    fields = record['fields']
+    return Product(id=record['pk'], **{attname: fields[name] for name, attname in PRODUCT_FIXTURE_FIELDS.items()
+                                       if name in fields})
+
+
+CATEGORY_UPDATE_FIELDS = ['name', 'description']
+# Поля, которые повторная загрузка обновляет у существующих товаров. Владелец, публикация и
+# изображение меняются на сайте (модераторами и владельцами) и задаются из фикстуры только для новых товаров
+PRODUCT_UPDATE_FIELDS = ['name', 'description', 'category', 'price', 'created_at']
+
+
+def import_objects(model, records, build, update_fields, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """
+    Загружает объекты фикстуры в таблицу пачками по batch_size.
+
+    Каждая пачка записывается INSERT ... ON CONFLICT (id) DO UPDATE в своей
+    транзакции: существующие строки обновляются, новые добавляются, таблица не очищается
+    и остается доступной для чтения во время загрузки. При конфликте обновляются только
+    поля из update_fields, которые есть в записи фикстуры: отсутствующие в ней поля
+    у существующих строк не затираются значениями по умолчанию.
+    Записи с разным набором полей пишутся отдельными INSERT.
+    progress(count) вызывается после каждой пачки. Возвращает количество загруженных объектов.
+    """
+    auto_now_fields = [field.name for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)]
+    total = 0
+    for batch in iter_batches(records, batch_size):
+        groups = {}
+        for record in batch:
+            present = tuple(name for name in update_fields if name in record['fields'])
+            groups.setdefault(present, []).append(build(record))
+        with transaction.atomic():
+            for present, objs in groups.items():
+                model.objects.bulk_create(objs, update_conflicts=True, unique_fields=['id'],
+                                          update_fields=list(present) + auto_now_fields)
+        total += len(batch)
+        if progress is not None:
+            progress(total)
+    return total
+
+
+def reset_sequences(*models):
+    """Сдвигает последовательности id после вставки объектов с явными первичными ключами"""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
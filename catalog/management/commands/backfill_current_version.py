@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+
+from catalog.models import Product
+
+BACKFILL_SQL = """
+UPDATE catalog_product p
+SET current_version_id = (
+    SELECT v.id FROM catalog_version v WHERE v.product_id = p.id AND v.is_actual LIMIT 1
+)
+WHERE p.id > %s AND p.id <= %s
+"""
+
+
+class Command(BaseCommand):
+    """Заполняет Product.current_version для существующих товаров"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Количество товаров в одном UPDATE')
+
+    def handle(self, *args, **options):
+        """
+        Обновляет товары диапазонами первичного ключа, каждый диапазон в своей короткой транзакции,
+        чтобы не держать блокировки на всей таблице.
+        """
+        batch_size = options['batch_size']
+        max_pk = Product.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        updated = 0
+        for start in range(0, max_pk, batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(BACKFILL_SQL, [start, start + batch_size])
+                updated += cursor.rowcount
+            self.stdout.write(f'Обработано товаров до id {min(start + batch_size, max_pk)} из {max_pk}')
+        self.stdout.write(f'Обновлено товаров: {updated}')
@@ -0,0 +1,36 @@
+import pickle
+import timeit
+
+from django.core.management import BaseCommand
+
+from catalog.models import Category, Product
+from catalog.services import pack_rows, unpack_rows, CategoryRow, ProductRow, CATEGORY_CACHE_FIELDS, \
+    PRODUCT_CACHE_FIELDS
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает размер записи в кеше и время ее чтения для двух вариантов:
+    pickle QuerySet (как кеш сериализует его при cache.set) и компактный пакет из pack_rows.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100, help='Количество чтений для замера')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        cases = (
+            ('categories', Category.objects.all(), CATEGORY_CACHE_FIELDS, CategoryRow),
+            ('products', Product.objects.all(), PRODUCT_CACHE_FIELDS, ProductRow),
+        )
+        for name, queryset, fields, row_class in cases:
+            old_payload = pickle.dumps(queryset.all(), protocol=pickle.HIGHEST_PROTOCOL)
+            new_payload = pickle.dumps(pack_rows(queryset.values_list(*fields)), protocol=pickle.HIGHEST_PROTOCOL)
+
+            old_time = timeit.timeit(lambda: list(pickle.loads(old_payload)), number=iterations) / iterations
+            new_time = timeit.timeit(lambda: unpack_rows(pickle.loads(new_payload), row_class),
+                                     number=iterations) / iterations
+
+            self.stdout.write(f'{name} ({queryset.count()} строк):')
+            self.stdout.write(f'  QuerySet: {len(old_payload)} байт, чтение {old_time * 1000:.3f} мс')
+            self.stdout.write(f'  пакет:    {len(new_payload)} байт, чтение {new_time * 1000:.3f} мс')
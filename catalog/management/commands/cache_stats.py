@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from catalog.services import get_cache_stats
+
+
+class Command(BaseCommand):
+    """Выводит счетчики попаданий, промахов и пересборок кеша каталога"""
+
+    def handle(self, *args, **options):
+        for name, stats in get_cache_stats().items():
+            self.stdout.write(f'{name}: ' + ', '.join(f'{event}={count}' for event, count in stats.items()))
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management import BaseCommand
+
+from catalog.exporter import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    """Выгружает каталог товаров с категориями, владельцами и версиями в CSV или JSON Lines"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Формат выгрузки')
+        parser.add_argument('--output', help='Файл выгрузки, по умолчанию стандартный вывод')
+        parser.add_argument('--gzip', action='store_true', help='Сжать выгрузку gzip')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help='Количество товаров, читаемых из курсора за раз')
+
+    def handle(self, *args, **options):
+        stream = iter_export(options['format'], compress=options['gzip'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                f.writelines(stream)
+        else:
+            sys.stdout.buffer.writelines(stream)
+            sys.stdout.buffer.flush()
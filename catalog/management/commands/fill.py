@@ -1,58 +1,39 @@
-import json
-
 from django.core.management import BaseCommand
 
+from catalog.importer import (build_category, build_product, CATEGORY_UPDATE_FIELDS, import_objects,
+                              IMPORT_BATCH_SIZE, iter_fixture, PRODUCT_UPDATE_FIELDS, reset_sequences)
 from catalog.models import Product, Category
+from catalog.services import bump_generation, invalidate_catalog
 
 
 class Command(BaseCommand):
+    """Наполняет базу данными из фикстур"""
 
-    @staticmethod
-    def json_read_categories():
-        """Возвращает, список категорий"""
-        with open('catalog_Category_data.json', encoding='utf-16') as f:
-            result = json.load(f)
-            categories_list = []
-            for i in result:
-                categories_list.append(i)
-            return categories_list
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', default='catalog_Category_data.json', help='Фикстура категорий')
+        parser.add_argument('--products', default='catalog_Product_data.json', help='Фикстура товаров')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help='Количество объектов в одном INSERT')
 
-    @staticmethod
-    def json_read_products():
-        """Возвращает, список продуктов"""
-        with open('catalog_Product_data.json', encoding='utf-16') as f:
-            result = json.load(f)
-            products_list = []
-            for i in result:
-                products_list.append(i)
-            return products_list
+    def progress(self, name):
+        def report(count):
+            self.stdout.write(f'{name}: загружено {count}')
+        return report
 
     def handle(self, *args, **options):
-        """Наполняет базу данными из фикстур"""
-        # Очищаем таблицы
-        Product.objects.all().delete()
-        Category.objects.all().delete()
-
-        # Списки для хранения объектов
-        product_for_create = []
-        category_for_create = []
-
-        # Обходим все значения категорий из фиктсуры для получения информации об одном объекте
-        for category in Command.json_read_categories():
-            category_for_create.append(
-                Category(id=category['pk'], name=category['fields']['name'],
-                         description=category['fields']['description'])
-            )
-
-        # Создаем объекты в базе с помощью метода bulk_create()
-        Category.objects.bulk_create(category_for_create)
-        # Обходим все значения продуктов из фиктсуры для получения информации об одном объекте
-        for product in Command.json_read_products():
-            product_for_create.append(
-                Product(id=product['pk'], category=Category.objects.get(pk=product['fields']['category']),
-                        name=product['fields']['name'], price=product['fields']['price'],
-                        description=product['fields']['description'])
-            )
-
-        # Создаем объекты в базе с помощью метода bulk_create()
-        Product.objects.bulk_create(product_for_create)
+        """
+        Загружает категории, затем товары. Фикстуры читаются потоково, объекты пишутся
+        пачками с обновлением существующих строк, поэтому таблицы не очищаются заранее,
+        а память не зависит от размера фикстуры.
+        """
+        batch_size = options['batch_size']
+        categories = import_objects(Category, iter_fixture(options['categories']), build_category,
+                                    CATEGORY_UPDATE_FIELDS, batch_size, self.progress('Категории'))
+        products = import_objects(Product, iter_fixture(options['products']), build_product,
+                                  PRODUCT_UPDATE_FIELDS, batch_size, self.progress('Товары'))
+        reset_sequences(Category, Product)
+
+        # bulk_create() не вызывает сигналы, поэтому кеши сбрасываются один раз после загрузки
+        bump_generation('categories')
+        invalidate_catalog()
+        self.stdout.write(f'Загружено категорий: {categories}, товаров: {products}')
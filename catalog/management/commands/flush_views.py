@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+
+from catalog.services import flush_product_views
+
+
+class Command(BaseCommand):
+    """Переносит накопленные в кеше просмотры товаров в базу данных"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Количество товаров в одном UPDATE')
+
+    def handle(self, *args, **options):
+        total = flush_product_views(batch_size=options['batch_size'])
+        self.stdout.write(f'Перенесено просмотров: {total}')
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from catalog.models import Product
+from catalog.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    """Создает миниатюры изображений для уже существующих товаров"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать уже существующие миниатюры')
+
+    def handle(self, *args, **options):
+        names = (Product.objects.exclude(image='').exclude(image__isnull=True)
+                 .order_by().values_list('image', flat=True).distinct())
+        created = 0
+        for name in names.iterator():
+            try:
+                created += generate_thumbnails(name, force=options['force'])
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(f'Созданы миниатюры для {created} изображений')
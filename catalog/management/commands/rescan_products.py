@@ -0,0 +1,44 @@
+from django.core.management import BaseCommand
+from django.db.models.functions import Now
+
+from catalog.models import Product
+from catalog.moderation import get_matcher
+from catalog.services import invalidate_catalog
+
+
+class Command(BaseCommand):
+    """Проверяет все товары каталога на запрещенные слова"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Количество товаров в одной выборке')
+        parser.add_argument('--deactivate', action='store_true', help='Снять найденные товары с публикации')
+
+    def handle(self, *args, **options):
+        """
+        Обходит товары пачками по первичному ключу (WHERE id > последний id LIMIT n), читая
+        только id, name и description, и проверяет их одним скомпилированным поисковиком.
+        С --deactivate найденные товары каждой пачки снимаются с публикации одним UPDATE.
+        """
+        matcher = get_matcher()
+        batch_size = options['batch_size']
+        last_pk = 0
+        checked = found = 0
+        while True:
+            rows = list(Product.objects.filter(pk__gt=last_pk).order_by('pk')
+                        .values_list('pk', 'name', 'description')[:batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            checked += len(rows)
+            violations = []
+            for pk, name, description in rows:
+                words = matcher.find(name) + matcher.find(description)
+                if words:
+                    violations.append(pk)
+                    self.stdout.write(f'{pk}: {", ".join(dict.fromkeys(words))}')
+            found += len(violations)
+            if violations and options['deactivate']:
+                Product.objects.filter(pk__in=violations, is_active=True).update(is_active=False, updated_at=Now())
+        if found and options['deactivate']:
+            invalidate_catalog()
+        self.stdout.write(f'Проверено товаров: {checked}, с запрещенными словами: {found}')
@@ -0,0 +1,62 @@
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.core.management import BaseCommand
+from django.template.loaders.app_directories import get_app_template_dirs
+
+STATIC_TAG_RE = re.compile(r"""{%\s*static\s+['"]([^'"]+)['"]""")
+# Варианты сборок, которые обычно не нужны в продакшене
+VARIANT_PATTERNS = (
+    ('rtl', re.compile(r'\.rtl\.')),
+    ('esm', re.compile(r'\.esm\.')),
+    ('source map', re.compile(r'\.map$')),
+    ('non-minified', re.compile(r'^(?!.*\.min\.).*\.(css|js)$')),
+)
+
+
+class Command(BaseCommand):
+    """
+    Отчет по статическим файлам проекта (STATICFILES_DIRS): какие файлы подключаются в шаблонах,
+    а какие попадают в сборку без использования (rtl, esm, неминифицированные версии, source map).
+    """
+
+    def handle(self, *args, **options):
+        files = self.get_static_files()
+        used = self.get_used_files() & files.keys()
+        unused_size = 0
+        for path, size in sorted(files.items()):
+            if path in used or self.is_map_of_used(path, used):
+                continue
+            reasons = [name for name, pattern in VARIANT_PATTERNS if pattern.search(os.path.basename(path))]
+            unused_size += size
+            self.stdout.write(f'{path}\t{size // 1024} КБ\t{", ".join(reasons) or "не используется"}')
+        self.stdout.write(f'Используются: {", ".join(sorted(used))}')
+        self.stdout.write(f'Не используются: {unused_size // 1024} КБ')
+
+    @staticmethod
+    def get_static_files():
+        files = {}
+        for path, storage in FileSystemFinder().list(['CVS', '.*', '*~']):
+            files.setdefault(path.replace(os.sep, '/'), storage.size(path))
+        return files
+
+    @staticmethod
+    def get_used_files():
+        template_dirs = [str(path) for path in get_app_template_dirs('templates')]
+        for engine in settings.TEMPLATES:
+            template_dirs.extend(str(path) for path in engine.get('DIRS', []))
+        used = set()
+        for template_dir in template_dirs:
+            for root, _, names in os.walk(template_dir):
+                for name in names:
+                    if name.endswith('.html'):
+                        with open(os.path.join(root, name), encoding='utf-8') as file:
+                            used.update(STATIC_TAG_RE.findall(file.read()))
+        return used
+
+    @staticmethod
+    def is_map_of_used(path, used):
+        """Source map подключенного файла нужна для отладки в браузере, его не помечаем"""
+        return path.endswith('.map') and path[:-len('.map')] in used
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_alter_product_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='product_active_created_idx'),
+        ),
+    ]
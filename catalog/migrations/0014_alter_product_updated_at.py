@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_product_active_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
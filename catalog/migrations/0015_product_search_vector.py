@@ -0,0 +1,47 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_TRIGGER_SQL = """
+CREATE FUNCTION catalog_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, search_vector ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_search_vector_update();
+
+UPDATE catalog_product SET search_vector = NULL;
+"""
+
+SEARCH_VECTOR_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_search_vector_trigger ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_alter_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER_SQL, SEARCH_VECTOR_TRIGGER_REVERSE_SQL),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+    ]
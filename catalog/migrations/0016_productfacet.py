@@ -0,0 +1,87 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Границы должны совпадать с catalog.models.PRICE_BUCKETS
+FACET_TRIGGER_SQL = """
+CREATE FUNCTION catalog_product_facet_update() RETURNS trigger AS $$
+DECLARE
+    buckets numeric[] := ARRAY[1000, 5000, 10000, 50000];
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.is_active = NEW.is_active AND OLD.category_id = NEW.category_id
+            AND width_bucket(OLD.price, buckets) = width_bucket(NEW.price, buckets) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.is_active THEN
+        UPDATE catalog_productfacet SET count = count - 1
+        WHERE category_id = OLD.category_id AND price_bucket = width_bucket(OLD.price, buckets);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active THEN
+        INSERT INTO catalog_productfacet (category_id, price_bucket, count)
+        VALUES (NEW.category_id, width_bucket(NEW.price, buckets), 1)
+        ON CONFLICT (category_id, price_bucket) DO UPDATE SET count = catalog_productfacet.count + 1;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_product_facet_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF category_id, price, is_active ON catalog_product
+    FOR EACH ROW EXECUTE FUNCTION catalog_product_facet_update();
+
+INSERT INTO catalog_productfacet (category_id, price_bucket, count)
+SELECT category_id, width_bucket(price, ARRAY[1000, 5000, 10000, 50000]::numeric[]), count(*)
+FROM catalog_product
+WHERE is_active
+GROUP BY 1, 2;
+"""
+
+FACET_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS catalog_product_facet_trigger ON catalog_product;
+DROP FUNCTION IF EXISTS catalog_product_facet_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_bucket', models.PositiveSmallIntegerField(verbose_name='Ценовой диапазон')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество товаров')),
+            ],
+            options={
+                'verbose_name': 'Счетчик фильтра',
+                'verbose_name_plural': 'Счетчики фильтров',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'created_at', 'id'], name='product_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['owner', 'created_at', 'id'], name='product_active_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'price'], name='product_active_cat_price_idx'),
+        ),
+        migrations.AddField(
+            model_name='productfacet',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='catalog.category', verbose_name='Категория'),
+        ),
+        migrations.AddConstraint(
+            model_name='productfacet',
+            constraint=models.UniqueConstraint(fields=('category', 'price_bucket'), name='product_facet_unique'),
+        ),
+        migrations.RunSQL(FACET_TRIGGER_SQL, FACET_TRIGGER_REVERSE_SQL),
+    ]
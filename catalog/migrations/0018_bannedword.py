@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+# Список, который раньше был зашит в ProductForm.banned_words
+INITIAL_BANNED_WORDS = ['казино', 'криптовалюта', 'крипта', 'биржа', 'дешево', 'бесплатно', 'обман', 'полиция',
+                        'радар']
+
+
+def create_banned_words(apps, schema_editor):
+    BannedWord = apps.get_model('catalog', 'BannedWord')
+    BannedWord.objects.bulk_create([BannedWord(word=word) for word in INITIAL_BANNED_WORDS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0017_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BannedWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100, unique=True, verbose_name='Слово')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+            ],
+            options={
+                'verbose_name': 'Запрещенное слово',
+                'verbose_name_plural': 'Запрещенные слова',
+                'ordering': ['word'],
+            },
+        ),
+        migrations.RunPython(create_banned_words, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Оставляет актуальной только старшую версию каждого товара, иначе уникальный индекс не создастся
+DEDUPLICATE_ACTUAL_SQL = """
+UPDATE catalog_version v SET is_actual = false
+WHERE v.is_actual AND EXISTS (
+    SELECT 1 FROM catalog_version w
+    WHERE w.product_id = v.product_id AND w.is_actual AND (w.version_number, w.id) > (v.version_number, v.id)
+);
+"""
+
+# Пересчитывает catalog_product.current_version_id при любом изменении версий товара,
+# включая bulk_create, bulk_update и удаление без сигналов. Заполнение существующих
+# товаров - команда backfill_current_version.
+CURRENT_VERSION_TRIGGER_SQL = """
+CREATE FUNCTION catalog_version_current_update() RETURNS trigger AS $$
+DECLARE
+    product_ids bigint[];
+    pid bigint;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        product_ids := ARRAY[NEW.product_id];
+    ELSIF TG_OP = 'DELETE' THEN
+        product_ids := ARRAY[OLD.product_id];
+    ELSIF OLD.product_id = NEW.product_id THEN
+        product_ids := ARRAY[NEW.product_id];
+    ELSE
+        product_ids := ARRAY[OLD.product_id, NEW.product_id];
+    END IF;
+
+    FOREACH pid IN ARRAY product_ids LOOP
+        UPDATE catalog_product p
+        SET current_version_id = actual.id, updated_at = now()
+        FROM (SELECT (SELECT id FROM catalog_version WHERE product_id = pid AND is_actual LIMIT 1) AS id) actual
+        WHERE p.id = pid AND p.current_version_id IS DISTINCT FROM actual.id;
+    END LOOP;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER catalog_version_current_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF product_id, is_actual ON catalog_version
+    FOR EACH ROW EXECUTE FUNCTION catalog_version_current_update();
+"""
+
+CURRENT_VERSION_TRIGGER_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS catalog_version_current_trigger ON catalog_version;
+DROP FUNCTION IF EXISTS catalog_version_current_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0018_bannedword'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUPLICATE_ACTUAL_SQL, migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='product',
+            name='current_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.version', verbose_name='Актуальная версия'),
+        ),
+        migrations.AddConstraint(
+            model_name='version',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_actual', True)), fields=('product',), name='version_one_actual_per_product'),
+        ),
+        migrations.RunSQL(CURRENT_VERSION_TRIGGER_SQL, CURRENT_VERSION_TRIGGER_REVERSE_SQL),
+    ]
@@ -1,10 +1,23 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 from users.models import User
 
 NULLABLE = {'null': True, 'blank': True}
 
+# Границы ценовых диапазонов для фильтра каталога.
+# Должны совпадать с массивом в триггере catalog_product_facet_update (миграция 0016).
+PRICE_BUCKETS = (1000, 5000, 10000, 50000)
+
+
+def get_price_bucket_range(bucket):
+    """Возвращает (min, max) цены для номера диапазона; max не включается, None - без границы"""
+    bounds = (None,) + PRICE_BUCKETS + (None,)
+    return bounds[bucket], bounds[bucket + 1]
+
 
 class Category(models.Model):
     """Категории товаров"""
@@ -17,6 +30,10 @@ class Category(models.Model):
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
+        indexes = [
+            # Триграммный индекс под поиск ILIKE '%...%' в админке
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='category_name_trgm_idx'),
+        ]
 
 
 class Product(models.Model):
@@ -28,7 +45,7 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='Категория')
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена')
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата создания')
-    updated_at = models.DateTimeField(default=timezone.now, verbose_name='Дата изменения')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
     viewed = models.IntegerField(default=0, verbose_name='Количество просмотров')
     is_active = models.BooleanField(default=True, verbose_name='Активен')
     slug = models.SlugField(**NULLABLE, max_length=150, unique=True, verbose_name="slug")
@@ -36,12 +53,34 @@ class Product(models.Model):
     owner = models.ForeignKey(User, verbose_name='Владелец', help_text='укажите владельца продукта', **NULLABLE,
                               on_delete=models.SET_NULL)
 
+    # Актуальная версия товара, поддерживается триггером на catalog_version
+    current_version = models.ForeignKey('Version', on_delete=models.SET_NULL, **NULLABLE, editable=False,
+                                        related_name='+', verbose_name='Актуальная версия')
+
+    # Поисковый вектор по name и description, заполняется триггером в базе данных
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name='Поисковый вектор')
+
     def __str__(self):
         return f'{self.name}, цена - {self.price}'
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
+        indexes = [
+            # Частичный индекс под курсорную пагинацию списка активных товаров
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_created_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            # Индексы под фильтры каталога в порядке курсорной пагинации
+            models.Index(fields=['category', 'created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_category_idx'),
+            models.Index(fields=['owner', 'created_at', 'id'], condition=models.Q(is_active=True),
+                         name='product_active_owner_idx'),
+            models.Index(fields=['category', 'price'], condition=models.Q(is_active=True),
+                         name='product_active_cat_price_idx'),
+            # Триграммный индекс под поиск ILIKE '%...%' в админке и автодополнение
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
+        ]
         permissions = [
             ("can_edit_category", "Edit Category"),
             ("can_edit_description", "Edit Description"),
@@ -49,6 +88,29 @@ class Product(models.Model):
         ]
 
 
+class ProductFacet(models.Model):
+    """
+    Количество активных товаров в категории и ценовом диапазоне.
+
+    Таблица поддерживается триггером на catalog_product, поэтому учитывает любые
+    изменения товаров, включая bulk_create и update().
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='Категория',
+                                 related_name='facets')
+    price_bucket = models.PositiveSmallIntegerField(verbose_name='Ценовой диапазон')
+    count = models.IntegerField(default=0, verbose_name='Количество товаров')
+
+    def __str__(self):
+        return f'{self.category_id}, диапазон {self.price_bucket} - {self.count}'
+
+    class Meta:
+        verbose_name = 'Счетчик фильтра'
+        verbose_name_plural = 'Счетчики фильтров'
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'price_bucket'], name='product_facet_unique'),
+        ]
+
+
 class Version(models.Model):
     """Версия продукта"""
     name = models.CharField(max_length=150, verbose_name='Наименование')
@@ -63,3 +125,25 @@ class Version(models.Model):
         verbose_name = 'Версия'
         verbose_name_plural = 'Версии'
         ordering = ['product', 'version_number']
+        constraints = [
+            models.UniqueConstraint(fields=['product'], condition=models.Q(is_actual=True),
+                                    name='version_one_actual_per_product'),
+        ]
+        indexes = [
+            # Триграммный индекс под поиск ILIKE '%...%' в админке
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='version_name_trgm_idx'),
+        ]
+
+
+class BannedWord(models.Model):
+    """Запрещенное слово для модерации товаров"""
+    word = models.CharField(max_length=100, unique=True, verbose_name='Слово')
+    is_active = models.BooleanField(default=True, verbose_name='Активно')
+
+    def __str__(self):
+        return f'{self.word}'
+
+    class Meta:
+        verbose_name = 'Запрещенное слово'
+        verbose_name_plural = 'Запрещенные слова'
+        ordering = ['word']
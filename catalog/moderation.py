@@ -0,0 +1,79 @@
+import re
+
+from catalog.models import BannedWord
+from catalog.services import get_local
+from config.settings import LOCAL_CACHE_ENABLED
+
+# Латинские буквы, похожие на кириллические, которыми обходят фильтр ("kазино")
+HOMOGLYPHS = str.maketrans('aceopxyk', 'асеорхук')
+# Окончания, которые отбрасываются, чтобы слово находилось в разных формах
+ENDINGS = ('ия', 'ая', 'яя', 'ое', 'ее', 'ые', 'ий', 'ый', 'ой', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й')
+MIN_STEM_LENGTH = 4
+# Допустимые слова, в которые входит основа запрещенного слова ("криптография" и "крипта").
+# Слово разрешено во всех формах: сравнивается его основа
+ALLOWED_WORDS = ('криптография',)
+
+
+def normalize(text):
+    """Приводит текст к нижнему регистру, заменяет ё на е и латинские двойники кириллицы"""
+    return text.lower().replace('ё', 'е').translate(HOMOGLYPHS)
+
+
+def get_stem(word):
+    """Отбрасывает окончание слова, если после этого остается основа не короче MIN_STEM_LENGTH"""
+    word = normalize(word.strip())
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+class BannedWordsMatcher:
+    """
+    Поиск запрещенных слов одним проходом по тексту.
+
+    Все слова компилируются в одно регулярное выражение из основ. Основа ищется в любом месте
+    слова: "крипта" находит "крипты" и "криптой", "казино" - "суперказино". Слова текста,
+    начинающиеся с основы одного из allowed ("криптографический"), не считаются запрещенными.
+    """
+
+    def __init__(self, words, allowed=ALLOWED_WORDS):
+        self.stems = {}
+        for word in words:
+            self.stems.setdefault(get_stem(word), word)
+        self.allowed = tuple(get_stem(word) for word in allowed)
+        # Длинные основы раньше коротких, чтобы "криптовалют" не распознавалась как "крипт".
+        # Совпадение начинается с начала слова и захватывает его целиком, чтобы сверить слово с allowed
+        alternatives = '|'.join(re.escape(stem) for stem in sorted(self.stems, key=len, reverse=True))
+        self.pattern = re.compile(rf'(?<!\w)\w*?({alternatives})\w*') if self.stems else None
+
+    def find(self, text):
+        """Возвращает список найденных запрещенных слов без повторов в порядке появления"""
+        if not text or self.pattern is None:
+            return []
+        found = {}
+        for match in self.pattern.finditer(normalize(text)):
+            if not match.group(0).startswith(self.allowed):
+                found.setdefault(self.stems[match.group(1)], None)
+        return list(found)
+
+
+def build_matcher():
+    return BannedWordsMatcher(BannedWord.objects.filter(is_active=True).values_list('word', flat=True))
+
+
+def get_matcher():
+    """
+    Возвращает скомпилированный поисковик запрещенных слов.
+
+    Поисковик хранится в памяти процесса и пересобирается, когда сигналы BannedWord
+    увеличивают поколение 'banned_words' (см. get_local).
+    """
+    if not LOCAL_CACHE_ENABLED:
+        return build_matcher()
+    return get_local('banned_words', lambda generation: build_matcher())
+
+
+def find_banned_words(text):
+    """Возвращает список запрещенных слов, найденных в тексте"""
+    return get_matcher().find(text)
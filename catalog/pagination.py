@@ -0,0 +1,150 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+# Наибольшее значение первичного ключа (bigint в PostgreSQL)
+MAX_BIGINT = 2 ** 63 - 1
+
+
+class KeysetPage:
+    """Страница выборки при курсорной пагинации"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Курсорная (keyset) пагинация по паре полей (created_at, id).
+
+    В отличие от OFFSET-пагинации стоимость любой страницы одинакова: запрос начинается
+    с позиции курсора и читает из индекса только page_size + 1 строк.
+    Курсор - это закодированные значения (created_at, id) крайнего объекта страницы
+    и направление перехода ('n' - следующая страница, 'p' - предыдущая).
+    """
+    # Порядок выдачи: сначала новые товары
+    ordering = ('-created_at', '-id')
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    @staticmethod
+    def encode_cursor(direction, obj):
+        """Кодирует позицию объекта в строку курсора"""
+        raw = f'{direction}|{obj.created_at.isoformat()}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Возвращает (direction, created_at, id) или None, если курсор некорректен.
+
+        Некорректным считается и курсор с датой без часового пояса или с id вне диапазона bigint:
+        такие значения нельзя корректно сравнить с полями в базе.
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            direction, created_at, pk = raw.split('|')
+            created_at = datetime.fromisoformat(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        if direction not in ('n', 'p') or timezone.is_naive(created_at) or not 0 < pk <= MAX_BIGINT:
+            return None
+        return direction, created_at, pk
+
+    @staticmethod
+    def _before(created_at, pk):
+        """Условие 'строго раньше позиции курсора' в порядке (created_at, id)"""
+        return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+    @staticmethod
+    def _after(created_at, pk):
+        """Условие 'строго позже позиции курсора' в порядке (created_at, id)"""
+        return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу, начинающуюся с позиции курсора"""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        limit = self.per_page + 1
+
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                next_cursor=self.encode_cursor('n', rows[-1]) if has_more else None,
+            )
+
+        direction, created_at, pk = decoded
+        if direction == 'n':
+            rows = list(self.queryset.filter(self._before(created_at, pk)).order_by(*self.ordering)[:limit])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                next_cursor=self.encode_cursor('n', rows[-1]) if has_more else None,
+                previous_cursor=self.encode_cursor('p', rows[0]) if rows else None,
+            )
+
+        # Предыдущая страница: читаем в обратном порядке и разворачиваем результат
+        rows = list(self.queryset.filter(self._after(created_at, pk)).order_by('created_at', 'id')[:limit])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor('n', rows[-1]) if rows else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if has_more else None,
+        )
+
+
+def get_estimated_count(model):
+    """Оценка количества строк таблицы из статистики планировщика (pg_class.reltuples)"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для списков админки на больших таблицах.
+
+    Для выборки без фильтров точный COUNT(*) заменяется оценкой планировщика, если
+    таблица больше estimate_threshold строк. Отфильтрованные выборки считаются точно.
+    """
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = get_estimated_count(queryset.model)
+            if estimate > self.estimate_threshold:
+                return estimate
+        return super().count
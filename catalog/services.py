@@ -1,30 +1,523 @@
+import atexit
+import hashlib
+import pickle
+import threading
+import time
+import zlib
+from collections import namedtuple, Counter
+from functools import partial
+
 from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.db import transaction
+from django.db.models import F, Case, When, Value, IntegerField, Count
+from django.db.models.functions import Now
+
+from catalog.models import Product, Category, Version, ProductFacet, PRICE_BUCKETS, get_price_bucket_range
+from config.cache import get_redis_client, redis_key, get_generation, bump_generation, get_local
+from config.settings import CACHE_ENABLED, LOCAL_CACHE_ENABLED
+
+
+# Время "свежести" значения в кеше, после него значение пересобирается
+CACHE_TIMEOUT = 60 * 60
+# Сколько еще можно отдавать устаревшее значение, пока один процесс его пересобирает
+CACHE_STALE_TIMEOUT = 60 * 5
+# Время жизни блокировки пересборки
+CACHE_LOCK_TIMEOUT = 30
+# Сколько ждать чужой пересборки при полном промахе, прежде чем идти в базу самому
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL_INTERVAL = 0.05
+
+CACHE_STATS_EVENTS = ('hit', 'miss', 'rebuild')
+
+
+def invalidate_catalog():
+    """
+    Сбрасывает кеш товаров и страниц каталога.
+
+    Вызывается после изменений товаров, которые не вызывают сигналы (bulk_create, update()),
+    один раз на пачку или загрузку, а не на каждый товар.
+    """
+    bump_generation('products')
+    bump_generation('pages')
+
+
+# Счетчики попаданий копятся в памяти процесса и переносятся в кеш не чаще раза в столько секунд
+CACHE_STATS_FLUSH_INTERVAL = 10
+
+_cache_stats_pending = Counter()
+_cache_stats_lock = threading.Lock()
+_cache_stats_flushed_at = time.monotonic()
+
+
+def _incr_cache_stat(name, event):
+    """Учитывает событие кеша в памяти процесса, без обращения к Redis на каждом попадании"""
+    with _cache_stats_lock:
+        _cache_stats_pending[f'cache_stats:{name}:{event}'] += 1
+        due = time.monotonic() - _cache_stats_flushed_at >= CACHE_STATS_FLUSH_INTERVAL
+    if due:
+        flush_cache_stats()
+
+
+def flush_cache_stats():
+    """Переносит накопленные в процессе счетчики в кеш: в Redis - одним конвейером INCRBY"""
+    global _cache_stats_flushed_at
+    with _cache_stats_lock:
+        pending = dict(_cache_stats_pending)
+        _cache_stats_pending.clear()
+        _cache_stats_flushed_at = time.monotonic()
+    if not pending:
+        return
+    client = get_redis_client()
+    if client is not None:
+        pipeline = client.pipeline(transaction=False)
+        for key, count in pending.items():
+            pipeline.incrby(redis_key(key), count)
+        pipeline.execute()
+        return
+    for key, count in pending.items():
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            pass
+
+
+atexit.register(flush_cache_stats)
+
+
+def get_cache_stats(names=('categories', 'products')):
+    """Возвращает счетчики попаданий, промахов и пересборок: {name: {event: count}}"""
+    flush_cache_stats()
+    keys = {f'cache_stats:{name}:{event}': (name, event) for name in names for event in CACHE_STATS_EVENTS}
+    values = cache.get_many(keys)
+    stats = {name: dict.fromkeys(CACHE_STATS_EVENTS, 0) for name in names}
+    for key, (name, event) in keys.items():
+        stats[name][event] = values.get(key, 0)
+    return stats
+
+
+def _rebuild(name, key, lock_key, builder):
+    try:
+        value = builder()
+        cache.set(key, (value, time.time() + CACHE_TIMEOUT), timeout=CACHE_TIMEOUT + CACHE_STALE_TIMEOUT)
+        _incr_cache_stat(name, 'rebuild')
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def get_or_rebuild(name, builder, generation=None):
+    """
+    Возвращает значение группы name из кеша, при необходимости пересобирая его через builder().
+
+    Ключ включает номер поколения, который увеличивается сигналами при изменении данных.
+    Пересобирает значение только процесс, захвативший блокировку (cache.add):
+    - если значение устарело, остальные процессы пока отдают старое;
+    - если значения нет совсем, остальные недолго ждут результат и только потом идут в базу сами.
+    """
+    if generation is None:
+        generation = get_generation(name)
+    key = f'{name}:v{generation}'
+    lock_key = f'{key}:lock'
+    cached = cache.get(key)
+
+    if cached is not None:
+        value, fresh_until = cached
+        _incr_cache_stat(name, 'hit')
+        if time.time() < fresh_until or not cache.add(lock_key, 1, timeout=CACHE_LOCK_TIMEOUT):
+            return value
+        return _rebuild(name, key, lock_key, builder)
 
-from catalog.models import Product, Category
-from config.settings import CACHE_ENABLED
+    _incr_cache_stat(name, 'miss')
+    if cache.add(lock_key, 1, timeout=CACHE_LOCK_TIMEOUT):
+        return _rebuild(name, key, lock_key, builder)
+
+    deadline = time.time() + CACHE_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(CACHE_LOCK_POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached[0]
+    return builder()
+
+
+def get_hot(name, builder, row_class):
+    """
+    Возвращает редко меняющиеся данные группы name через два уровня кеша: память процесса (get_local)
+    и общий кеш (get_or_rebuild).
+    """
+    if not LOCAL_CACHE_ENABLED:
+        return unpack_rows(get_or_rebuild(name, builder), row_class)
+    return get_local(name, lambda generation: tuple(unpack_rows(get_or_rebuild(name, builder, generation),
+                                                                row_class)))
+
+
+# Поля, которые хранятся в кеше для списков категорий и товаров
+CATEGORY_CACHE_FIELDS = ('id', 'name', 'description')
+PRODUCT_CACHE_FIELDS = ('id', 'name', 'description', 'image', 'category_id', 'price', 'created_at', 'updated_at',
+                        'viewed', 'is_active', 'slug', 'owner_id')
+# Пакеты больше этого размера (в байтах) сжимаются zlib
+CACHE_COMPRESS_THRESHOLD = 1024
+
+
+def make_row_class(name, fields):
+    """Создает легкий неизменяемый класс строки (namedtuple с атрибутом pk)"""
+    return type(name, (namedtuple(name, fields),), {'__slots__': (), 'pk': property(lambda self: self[0])})
+
+
+CategoryRow = make_row_class('CategoryRow', CATEGORY_CACHE_FIELDS)
+ProductRow = make_row_class('ProductRow', PRODUCT_CACHE_FIELDS)
+
+
+def pack_rows(rows):
+    """
+    Упаковывает строки values_list в компактный пакет для кеша.
+
+    В кеш попадают только кортежи значений, без экземпляров моделей с _state и без
+    структуры запроса. Пакеты больше CACHE_COMPRESS_THRESHOLD дополнительно сжимаются.
+    Первый байт пакета - признак сжатия.
+    """
+    data = pickle.dumps(tuple(rows), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) > CACHE_COMPRESS_THRESHOLD:
+        return b'z' + zlib.compress(data)
+    return b'r' + data
+
+
+def unpack_rows(payload, row_class):
+    """Распаковывает пакет из pack_rows в список объектов row_class"""
+    data = payload[1:]
+    if payload[:1] == b'z':
+        data = zlib.decompress(data)
+    return [row_class._make(row) for row in pickle.loads(data)]
 
 
 def get_categories_from_cache():
     """Получаем список категорий из кеша или делаем запрос на сервер"""
     if not CACHE_ENABLED:
         return Category.objects.all()
-    key = 'categories_list'
-    categories = cache.get(key)
-    if categories is not None:
-        return categories
-    categories = Category.objects.all()
-    cache.set(key, categories)
-    return categories
+    return get_hot('categories', lambda: pack_rows(Category.objects.values_list(*CATEGORY_CACHE_FIELDS)), CategoryRow)
 
 
 def get_products_from_cache():
     """Получаем список продуктов из кеша или делаем запрос на сервер"""
     if not CACHE_ENABLED:
         return Product.objects.all()
-    key = 'products_list'
-    products = cache.get(key)
-    if products is not None:
-        return products
-    products = Product.objects.all()
-    cache.set(key, products)
+    payload = get_or_rebuild('products', lambda: pack_rows(Product.objects.values_list(*PRODUCT_CACHE_FIELDS)))
+    return unpack_rows(payload, ProductRow)
+
+
+def get_price_bucket_label(bucket):
+    """Подпись ценового диапазона для фильтра"""
+    low, high = get_price_bucket_range(bucket)
+    if low is None:
+        return f'до {high} ₽'
+    if high is None:
+        return f'от {low} ₽'
+    return f'{low} - {high} ₽'
+
+
+def get_facet_counts(category_id=None, price_bucket=None, owner_id=None):
+    """
+    Возвращает счетчики для боковой панели фильтров каталога.
+
+    Результат: (categories, buckets), где categories - список (id, name, count),
+    buckets - список (bucket, label, count). Счетчики категорий учитывают выбранный
+    ценовой диапазон, счетчики диапазонов - выбранную категорию.
+
+    Без фильтра по владельцу счетчики читаются одним запросом из таблицы ProductFacet,
+    которую поддерживает триггер. Для фильтра по владельцу группировка выполняется
+    по товарам владельца (индекс product_active_owner_idx).
+    """
+    if owner_id is None:
+        rows = ProductFacet.objects.filter(count__gt=0).values_list('category_id', 'category__name',
+                                                                    'price_bucket', 'count')
+    else:
+        bucket_expression = Case(
+            *[When(price__lt=bound, then=Value(bucket)) for bucket, bound in enumerate(PRICE_BUCKETS)],
+            default=Value(len(PRICE_BUCKETS)),
+            output_field=IntegerField(),
+        )
+        rows = (Product.objects.filter(is_active=True, owner_id=owner_id)
+                .values('category_id', 'category__name')
+                .annotate(price_bucket=bucket_expression, count=Count('id'))
+                .values_list('category_id', 'category__name', 'price_bucket', 'count'))
+
+    categories = {}
+    buckets = dict.fromkeys(range(len(PRICE_BUCKETS) + 1), 0)
+    for row_category_id, category_name, bucket, count in rows:
+        if price_bucket is None or bucket == price_bucket:
+            name, total = categories.get(row_category_id, (category_name, 0))
+            categories[row_category_id] = (name, total + count)
+        if category_id is None or row_category_id == category_id:
+            buckets[bucket] += count
+    return (
+        sorted(((pk, name, count) for pk, (name, count) in categories.items()), key=lambda item: item[1]),
+        [(bucket, get_price_bucket_label(bucket), count) for bucket, count in buckets.items()],
+    )
+
+
+# Права модератора товаров
+MODERATOR_PERMISSIONS = ('catalog.can_edit_category', 'catalog.can_edit_description', 'catalog.can_edit_is_active')
+# Адрес администратора, которому в шаблонах показываются кнопки управления всеми товарами
+ADMIN_EMAIL = 'admin@example.com'
+
+
+def get_product_owner_key(user_pk):
+    """
+    Ключ признака "у пользователя есть товары", от которого зависит класс прав в кеше страниц.
+
+    Ключ включает поколение 'products': его увеличивают и сигналы Product, и массовые изменения
+    без сигналов (fill, массовая модерация), поэтому признак не переживает изменение товаров.
+    """
+    return f'product_owner:v{get_generation("products")}:{user_pk}'
+
+
+def is_product_owner(user_pk):
+    """Есть ли у пользователя товары (значение из кеша, при промахе - один EXISTS)"""
+    if not CACHE_ENABLED:
+        return Product.objects.filter(owner_id=user_pk).exists()
+    return cache.get_or_set(get_product_owner_key(user_pk),
+                            lambda: Product.objects.filter(owner_id=user_pk).exists(),
+                            timeout=CACHE_TIMEOUT)
+
+
+def get_page_role(user):
+    """
+    Возвращает класс прав пользователя, от которого зависит разметка страниц каталога.
+
+    Страницы кешируются не для каждой сессии, а для каждого класса: admin, moderator, user.
+    Владельцы товаров видят кнопки управления своими карточками, поэтому для них класс
+    персональный - owner:<pk>.
+    """
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.email == ADMIN_EMAIL:
+        return 'admin'
+    if is_product_owner(user.pk):
+        return f'owner:{user.pk}'
+    if user.has_perms(MODERATOR_PERMISSIONS):
+        return 'moderator'
+    return 'user'
+
+
+def get_page_cache_key(request, role):
+    """Ключ страницы в кеше: поколение страниц, класс прав и адрес запроса"""
+    url_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:v{get_generation("pages")}:{role}:{url_hash}'
+
+
+# Время жизни отрендеренной карточки товара
+PRODUCT_CARD_TIMEOUT = 60 * 60 * 24
+
+
+def get_product_card_key(product):
+    """Ключ карточки товара: меняется при каждом сохранении товара вместе с updated_at"""
+    return f'product_card:{product.pk}:{int(product.updated_at.timestamp() * 1_000_000)}'
+
+
+def render_product_cards(products):
+    """
+    Проставляет каждому товару атрибут card_html с отрендеренной карточкой.
+
+    Все карточки страницы читаются из кеша одним get_many, рендерятся только отсутствующие,
+    и они же записываются одним set_many. Старые версии карточек не удаляются явно:
+    после сохранения товара меняется updated_at, а с ним и ключ.
+    """
+    products = list(products)
+    keys = {get_product_card_key(product): product for product in products}
+    cached = cache.get_many(keys) if CACHE_ENABLED else {}
+    rendered = {}
+    for key, product in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string('catalog/includes/inc_product_card.html', {'product': product})
+        product.card_html = mark_safe(html)
+    if rendered and CACHE_ENABLED:
+        cache.set_many(rendered, PRODUCT_CARD_TIMEOUT)
     return products
+
+
+def get_product_views_key(pk):
+    """Ключ счетчика еще не сохраненных в базу просмотров товара"""
+    return f'product_views:{pk}'
+
+
+# Множество id товаров, у которых есть не перенесенные в базу просмотры
+PENDING_VIEWS_KEY = 'product_views:pending'
+
+
+def increment_product_views(pk):
+    """
+    Учитывает просмотр товара.
+
+    Просмотр атомарно увеличивает счетчик в кеше (INCR в Redis) без обращения к базе и добавляет
+    id товара в множество PENDING_VIEWS_KEY; накопленные значения переносятся в Product.viewed
+    командой flush_views.
+    """
+    if not CACHE_ENABLED:
+        Product.objects.filter(pk=pk).update(viewed=F('viewed') + 1)
+        return
+    key = get_product_views_key(pk)
+    client = get_redis_client()
+    if client is not None:
+        # INCR создает отсутствующий ключ сам, счетчик и отметка в множестве - один конвейер
+        client.pipeline(transaction=False).incr(redis_key(key)).sadd(redis_key(PENDING_VIEWS_KEY), pk).execute()
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # ключ успел пропасть между add и incr
+        cache.set(key, 1, timeout=None)
+    pending = cache.get(PENDING_VIEWS_KEY, set())
+    if pk not in pending:
+        cache.set(PENDING_VIEWS_KEY, pending | {pk}, timeout=None)
+
+
+def _pop_pending_views(count):
+    """Извлекает из множества PENDING_VIEWS_KEY до count id просмотренных товаров"""
+    client = get_redis_client()
+    if client is not None:
+        return [int(pk) for pk in client.spop(redis_key(PENDING_VIEWS_KEY), count) or []]
+    # Без Redis множество хранится целиком в одном ключе (локальный кеш в разработке и тестах)
+    pending = cache.get(PENDING_VIEWS_KEY, set())
+    batch = set(list(pending)[:count])
+    cache.set(PENDING_VIEWS_KEY, pending - batch, timeout=None)
+    return list(batch)
+
+
+def get_pending_product_views(pk):
+    """Возвращает количество просмотров товара, еще не перенесенных в базу"""
+    if not CACHE_ENABLED:
+        return 0
+    return cache.get(get_product_views_key(pk)) or 0
+
+
+def flush_product_views(batch_size=1000):
+    """
+    Переносит накопленные в кеше просмотры в Product.viewed.
+
+    Обходятся только просмотренные товары: их id извлекаются из множества PENDING_VIEWS_KEY
+    (SPOP) пачками по batch_size, для каждой пачки счетчики читаются одним get_many,
+    а в базу уходит один UPDATE viewed = viewed + n. После записи счетчики уменьшаются на
+    перенесенное значение (а не обнуляются), поэтому просмотры, пришедшие во время сброса, не теряются:
+    такой просмотр снова добавляет id товара в множество. Возвращает общее количество перенесенных просмотров.
+    """
+    if not CACHE_ENABLED:
+        return 0
+    total = 0
+    while True:
+        pks = _pop_pending_views(batch_size)
+        if not pks:
+            break
+        total += _flush_product_views_batch(pks)
+    return total
+
+
+def _flush_product_views_batch(pks):
+    keys = {get_product_views_key(pk): pk for pk in pks}
+    pending = {keys[key]: value for key, value in cache.get_many(keys).items() if value}
+    if not pending:
+        return 0
+    with transaction.atomic():
+        Product.objects.filter(pk__in=pending).update(
+            viewed=F('viewed') + Case(
+                *[When(pk=pk, then=Value(value)) for pk, value in pending.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        )
+    for pk, value in pending.items():
+        try:
+            cache.decr(get_product_views_key(pk), value)
+        except ValueError:
+            pass
+    return sum(pending.values())
+
+
+def save_versions(formset):
+    """
+    Сохраняет проверенный набор форм версий товара пакетными запросами:
+    новые версии - одним bulk_create, измененные - одним bulk_update, удаленные - delete() выборки.
+
+    Пакетные запросы не вызывают сигналы Version, поэтому товар отмечается измененным
+    один раз на весь набор (touch_products), а не на каждую версию.
+    """
+    to_create, to_update, to_delete = [], [], []
+    changed_fields = set()
+    model_fields = {field.name for field in Version._meta.concrete_fields}
+    for form in formset.forms:
+        if form.instance.pk is not None and form.cleaned_data.get('DELETE'):
+            to_delete.append(form.instance.pk)
+        elif not form.has_changed() or form.cleaned_data.get('DELETE'):
+            continue
+        elif form.instance.pk is None:
+            version = form.save(commit=False)
+            version.product = formset.instance
+            to_create.append(version)
+        else:
+            to_update.append(form.save(commit=False))
+            changed_fields.update(model_fields.intersection(form.changed_data))
+
+    actual = [form.instance.pk for form in formset.forms
+              if form.has_changed() and form.cleaned_data.get('is_actual') and not form.cleaned_data.get('DELETE')]
+
+    with transaction.atomic():
+        if actual:
+            clear_actual_versions(formset.instance.pk, exclude_pk=actual[0])
+        if to_delete:
+            # delete() выборки обрабатывает on_delete ссылок на версию (Product.current_version)
+            Version.objects.filter(product=formset.instance, pk__in=to_delete).delete()
+        if to_update and changed_fields:
+            Version.objects.bulk_update(to_update, sorted(changed_fields))
+        if to_create:
+            Version.objects.bulk_create(to_create)
+        if to_delete or to_update or to_create:
+            touch_products([formset.instance.pk])
+
+
+def touch_products(product_ids):
+    """
+    Обновляет одним запросом updated_at товаров (от него зависят ETag страницы и ключ карточки)
+    после изменения их версий и сбрасывает кеш страниц после фиксации транзакции
+    """
+    Product.objects.filter(pk__in=product_ids).update(updated_at=Now())
+    transaction.on_commit(partial(bump_generation, 'pages'))
+
+
+def clear_actual_versions(product_id, exclude_pk=None):
+    """
+    Снимает признак актуальности с версий товара (кроме exclude_pk) перед тем, как сделать
+    актуальной другую версию: уникальный индекс допускает только одну актуальную версию.
+    """
+    queryset = Version.objects.filter(product_id=product_id, is_actual=True)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    queryset.update(is_actual=False)
+
+
+BULK_MODERATION_BATCH_SIZE = 1000
+
+
+def bulk_update_products(queryset, batch_size=BULK_MODERATION_BATCH_SIZE, **values):
+    """
+    Массово изменяет поля товаров выборки (is_active, category и т.п.), возвращает количество товаров.
+
+    Выборка обходится пачками по первичному ключу, каждая пачка изменяется одним UPDATE
+    в своей короткой транзакции. update() не вызывает сигналы, поэтому кеши сбрасываются
+    один раз на пачку, а не на каждый товар.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = 0
+    total = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        with transaction.atomic():
+            total += Product.objects.filter(pk__in=pks).update(updated_at=Now(), **values)
+        invalidate_catalog()
+    return total
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from catalog.models import Category, Product, Version, BannedWord
+from catalog.services import bump_generation, invalidate_catalog, touch_products
+from catalog.thumbnails import has_thumbnails, generate_thumbnails_async
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, **kwargs):
+    """Сбрасывает кеш категорий после фиксации изменения или удаления категории"""
+    transaction.on_commit(partial(bump_generation, 'categories'))
+    transaction.on_commit(partial(bump_generation, 'pages'))
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_products(sender, **kwargs):
+    """Сбрасывает кеш товаров после фиксации изменения или удаления товара"""
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=Product)
+def create_thumbnails(sender, instance, **kwargs):
+    """Запускает фоновое создание миниатюр после загрузки нового изображения"""
+    if instance.image and not has_thumbnails(instance.image.name):
+        transaction.on_commit(partial(generate_thumbnails_async, instance.image.name))
+
+
+@receiver(post_save, sender=Version)
+def invalidate_versions(sender, instance, **kwargs):
+    """
+    Отмечает товар измененным после сохранения версии. Удаление версий обрабатывают
+    save_versions и админка одним запросом на всю выборку, а не сигналом на каждую строку
+    """
+    touch_products([instance.product_id])
+
+
+@receiver([post_save, post_delete], sender=BannedWord)
+def invalidate_banned_words(sender, **kwargs):
+    """Пересобирает поисковик запрещенных слов после фиксации изменения списка"""
+    transaction.on_commit(partial(bump_generation, 'banned_words'))
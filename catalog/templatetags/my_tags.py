@@ -1,4 +1,8 @@
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from catalog.thumbnails import THUMBNAIL_SIZES, get_thumbnail_name, has_thumbnails
 
 register = template.Library()
 
@@ -8,3 +12,28 @@ def media_filter(path):
     if path:
         return f'/media/{path}'
     return '#'
+
+
+@register.simple_tag()
+def product_image(image, css_class='card-img-top', alt=''):
+    """
+    Выводит изображение товара с миниатюрами 1x/2x в WebP и JPEG.
+
+    Пока миниатюры не созданы, выводит оригинал с теми же размерами.
+    """
+    size = THUMBNAIL_SIZES[0]
+    name = getattr(image, 'name', image)
+    if not name or not has_thumbnails(name):
+        return format_html('<img class="{}" width="{}" height="{}" loading="lazy" src="{}" alt="{}">',
+                           css_class, size, size, media_filter(name), alt)
+
+    def srcset(extension):
+        return ', '.join(f'{default_storage.url(get_thumbnail_name(name, thumbnail_size, extension))} '
+                         f'{thumbnail_size // size}x' for thumbnail_size in THUMBNAIL_SIZES)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img class="{}" width="{}" height="{}" loading="lazy" src="{}" srcset="{}" alt="{}"></picture>',
+        srcset('webp'), css_class, size, size,
+        default_storage.url(get_thumbnail_name(name, size, 'jpg')), srcset('jpg'), alt,
+    )
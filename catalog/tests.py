@@ -1,3 +1,190 @@
-from django.test import TestCase
+import base64
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog.models import Category, Product, Version
+from catalog.moderation import BannedWordsMatcher
+from catalog.pagination import KeysetPaginator
+from catalog.services import bulk_update_products, get_page_role
+from catalog.views import ProductListView
+from users.models import User
+
+
+class ProductListQueriesTestCase(TestCase):
+    """Количество запросов страницы списка товаров не зависит от числа карточек"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(email='owner@example.com')
+        category = Category.objects.create(name='Клавиатуры')
+        Product.objects.bulk_create([
+            Product(name=f'Товар {i}', description='x' * 1000, price=100, category=category, owner=cls.user)
+            for i in range(100)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_product_list_query_count(self):
+        """
+        Пользователь (снимок еще не в кеше), проверка класса прав для кеша страниц, выборка товаров
+        и счетчики фильтров; сессия читается из кеша
+        """
+        with mock.patch.object(ProductListView, 'paginate_by', 100):
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('product_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['object_list']), 100)
+        self.assertContains(response, reverse('product_update', args=[Product.objects.first().pk]))
+
+    def test_cached_product_list_without_queries(self):
+        """Страница из кеша отдается без запросов: сессия, пользователь и класс прав берутся из кеша"""
+        self.client.get(reverse('product_list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('product_list'))
+        self.assertEqual(response.status_code, 200)
+
+
+class PageRoleTestCase(TestCase):
+    """Класс прав владельца в кеше страниц следует за массовой сменой владельца товаров"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(email='owner@example.com')
+        cls.user = User.objects.create(email='user@example.com')
+        Product.objects.create(name='Товар', price=100, category=Category.objects.create(name='Мыши'),
+                               owner=cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_reassignment_updates_owner_role(self):
+        self.assertEqual(get_page_role(self.owner), f'owner:{self.owner.pk}')
+        self.assertEqual(get_page_role(self.user), 'user')
+        bulk_update_products(Product.objects.all(), owner=self.user)
+        self.assertEqual(get_page_role(self.owner), 'user')
+        self.assertEqual(get_page_role(self.user), f'owner:{self.user.pk}')
+
+    def test_shared_page_without_owner_buttons(self):
+        """Бывший владелец получает общую для класса user страницу, в ней нет кнопок управления товаром"""
+        self.client.force_login(self.owner)
+        update_url = reverse('product_update', args=[Product.objects.get().pk])
+        self.assertContains(self.client.get(reverse('product_list')), update_url)
+        bulk_update_products(Product.objects.all(), owner=self.user)
+        self.assertNotContains(self.client.get(reverse('product_list')), update_url)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('product_list')), update_url)
+
+
+class KeysetPaginatorTestCase(TestCase):
+    """Курсорная пагинация: переходы по страницам и некорректные курсоры"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Мыши')
+        now = timezone.now()
+        # У пар товаров одинаковая дата создания: порядок внутри пары задает id
+        Product.objects.bulk_create([
+            Product(name=f'Товар {i}', price=100, category=category, created_at=now - timedelta(minutes=i // 2))
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Product.objects.all(), 10)
+        self.expected = list(Product.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    @staticmethod
+    def pks(page):
+        return [product.pk for product in page]
+
+    @staticmethod
+    def make_cursor(raw):
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def test_next_and_previous_round_trip(self):
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(first.next_cursor)
+        third = self.paginator.get_page(second.next_cursor)
+        self.assertEqual(self.pks(first) + self.pks(second) + self.pks(third), self.expected)
+        self.assertFalse(third.has_next())
+        self.assertEqual(self.pks(self.paginator.get_page(third.previous_cursor)), self.pks(second))
+        back_to_first = self.paginator.get_page(self.paginator.get_page(third.previous_cursor).previous_cursor)
+        self.assertEqual(self.pks(back_to_first), self.pks(first))
+        self.assertFalse(back_to_first.has_previous())
+
+    def test_invalid_cursors(self):
+        """Некорректный курсор не приводит к ошибке базы данных, а открывает первую страницу"""
+        created_at = timezone.now().isoformat()
+        cursors = [
+            'не base64',
+            self.make_cursor('x|2024-01-01T00:00:00+00:00|1'),
+            self.make_cursor('n|2024-01-01T00:00:00|1'),
+            self.make_cursor(f'n|{created_at}|{2 ** 63}'),
+            self.make_cursor(f'n|{created_at}|-1'),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(KeysetPaginator.decode_cursor(cursor))
+                self.assertEqual(self.pks(self.paginator.get_page(cursor)), self.expected[:10])
+
+
+class BannedWordsMatcherTestCase(SimpleTestCase):
+    """Основа запрещенного слова ищется в любом месте слова, кроме разрешенных слов"""
+
+    def setUp(self):
+        self.matcher = BannedWordsMatcher(['казино', 'крипта'])
+
+    def test_stem_inside_compound_word(self):
+        self.assertEqual(self.matcher.find('Лучшее суперказино и криптой оплата'), ['казино', 'крипта'])
+        self.assertEqual(self.matcher.find('Онлайн-kазино'), ['казино'])
+
+    def test_allowed_word(self):
+        self.assertEqual(self.matcher.find('Криптография для начинающих, криптографический модуль'), [])
+        self.assertEqual(self.matcher.find('Криптография и крипта'), ['крипта'])
+
+
+class VersionAdminTestCase(TestCase):
+    """Изменение версий товара в админке"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(email='admin@example.com', is_staff=True, is_superuser=True)
+        cls.product = Product.objects.create(name='Товар', price=100, category=Category.objects.create(name='Мыши'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_new_actual_version_replaces_previous(self):
+        previous = Version.objects.create(product=self.product, name='Версия 1', version_number=1, is_actual=True)
+        response = self.client.post(reverse('admin:catalog_version_add'), {
+            'product': self.product.pk, 'name': 'Версия 2', 'version_number': 2, 'is_actual': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Version.objects.get(is_actual=True).name, 'Версия 2')
+        previous.refresh_from_db()
+        self.assertFalse(previous.is_actual)
+
+    def test_bulk_delete_touches_product_once(self):
+        """Удаление выбранных версий обновляет товар одним запросом, а не на каждую версию"""
+        versions = Version.objects.bulk_create([
+            Version(product=self.product, name=f'Версия {i}', version_number=i, is_actual=False) for i in range(5)
+        ])
+        updated_at = self.product.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:catalog_version_changelist'), {
+                'action': 'delete_selected', 'post': 'yes', '_selected_action': [version.pk for version in versions],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Version.objects.exists())
+        touches = [query for query in queries if query['sql'].startswith('UPDATE "catalog_product" SET "updated_at"')]
+        self.assertEqual(len(touches), 1)
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.updated_at, updated_at)
@@ -0,0 +1,68 @@
+import os
+import threading
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from catalog.models import Product
+
+# Стороны квадратных миниатюр: 1x и 2x для карточки 200x200
+THUMBNAIL_SIZES = (200, 400)
+# Форматы миниатюр: (расширение, формат Pillow, параметры сохранения)
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+THUMBNAIL_DIR = 'thumbnails'
+
+
+def get_thumbnail_name(name, size, extension):
+    """Путь миниатюры в хранилище: thumbnails/<путь оригинала без расширения>_<size>.<extension>"""
+    base, _ = os.path.splitext(name)
+    return f'{THUMBNAIL_DIR}/{base}_{size}.{extension}'
+
+
+def has_thumbnails(name):
+    """Проверяет, созданы ли миниатюры изображения (по последней создаваемой)"""
+    extension = THUMBNAIL_FORMATS[-1][0]
+    return default_storage.exists(get_thumbnail_name(name, THUMBNAIL_SIZES[-1], extension))
+
+
+def generate_thumbnails(name, force=False):
+    """
+    Создает миниатюры всех размеров и форматов для изображения name из хранилища.
+
+    После создания обновляет updated_at у товаров с этим изображением, чтобы
+    закешированные карточки перерисовались уже с миниатюрами.
+    Возвращает True, если миниатюры были созданы.
+    """
+    if not force and has_thumbnails(name):
+        return False
+    with default_storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    for size in THUMBNAIL_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for extension, image_format, params in THUMBNAIL_FORMATS:
+            if image_format == 'JPEG' and thumbnail.mode != 'RGB':
+                thumbnail = thumbnail.convert('RGB')
+            buffer = BytesIO()
+            thumbnail.save(buffer, image_format, **params)
+            thumbnail_name = get_thumbnail_name(name, size, extension)
+            if default_storage.exists(thumbnail_name):
+                default_storage.delete(thumbnail_name)
+            default_storage.save(thumbnail_name, ContentFile(buffer.getvalue()))
+
+    Product.objects.filter(image=name).update(updated_at=timezone.now())
+    return True
+
+
+def generate_thumbnails_async(name):
+    """Создает миниатюры в фоновом потоке, не задерживая ответ на запрос"""
+    threading.Thread(target=generate_thumbnails, args=(name,), daemon=True).start()
@@ -1,55 +1,250 @@
-from django.contrib.auth.decorators import login_required
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.db.models import F
+from django.db.models.functions import Substr
 from django.forms import inlineformset_factory
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.views.decorators.http import condition
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
 
 from pytils.translit import slugify
 
-from catalog.forms import ProductForm, VersionForm, ProductModeratorForm
-from catalog.models import Product, Version, Category
-from catalog.services import get_categories_from_cache
+from catalog.exporter import EXPORT_FORMATS, iter_export
+from catalog.forms import ProductForm, VersionForm, ProductModeratorForm, BaseVersionFormSet, BulkModerationForm
+from catalog.models import Product, Version, Category, PRICE_BUCKETS, get_price_bucket_range
+from catalog.pagination import KeysetPaginator
+from catalog.services import get_categories_from_cache, increment_product_views, get_pending_product_views, \
+    get_page_role, get_page_cache_key, render_product_cards, get_facet_counts, get_generation, \
+    save_versions, bulk_update_products, MODERATOR_PERMISSIONS
+from config.settings import CACHE_ENABLED
 
 
 # контроллеры для сайта
 
+# Класс набора форм версий создается один раз при импорте, а не на каждый запрос
+VersionFormSet = inlineformset_factory(Product, Version, form=VersionForm, formset=BaseVersionFormSet, extra=1)
+
+
+def count_product_view(view_func):
+    """
+    Декоратор для учета просмотров страницы товара.
+
+    Оборачивает представление снаружи cache_page, поэтому просмотр учитывается
+    и тогда, когда страница отдается из кеша.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            increment_product_views(kwargs['pk'])
+        return response
+    return wrapper
+
+
+def cache_page_by_role(timeout):
+    """
+    Кеширует страницу отдельно для каждого класса прав пользователя (см. get_page_role).
+
+    В отличие от cache_page, разметка с кнопками владельца или администратора не попадает
+    к другим пользователям. Анонимные запросы не кешируются: их перенаправляет LoginRequiredMixin.
+    Записи сбрасываются сигналами моделей через поколение 'pages'.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not CACHE_ENABLED or request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+            key = get_page_cache_key(request, get_page_role(request.user))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                if hasattr(response, 'render'):
+                    response.render()
+                cache.set(key, (response.content, response['Content-Type']), timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_product_updated_at(request, pk):
+    """
+    Возвращает updated_at товара одним запросом по первичному ключу, запоминая результат
+    на время запроса (его используют и ETag, и Last-Modified).
+
+    Изменение версий товара тоже обновляет updated_at (см. catalog.signals), поэтому
+    этого значения достаточно для проверки актуальности страницы товара.
+    Для неавторизованных пользователей возвращает None: проверка не выполняется,
+    и запрос доходит до LoginRequiredMixin.
+    """
+    if not request.user.is_authenticated:
+        return None
+    cache_attr = f'_product_updated_at_{pk}'
+    if not hasattr(request, cache_attr):
+        updated_at = Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+        setattr(request, cache_attr, updated_at)
+    return getattr(request, cache_attr)
+
+
+def product_etag(request, pk):
+    updated_at = get_product_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return f'product-{pk}-{int(updated_at.timestamp() * 1_000_000)}'
+
+
+def product_last_modified(request, pk):
+    return get_product_updated_at(request, pk)
+
+
+def categories_etag(request):
+    """ETag списка категорий - поколение кеша категорий, без обращения к базе"""
+    if not request.user.is_authenticated or not CACHE_ENABLED:
+        return None
+    return f'categories-{get_generation("categories")}'
+
+
+product_condition = condition(etag_func=product_etag, last_modified_func=product_last_modified)
+categories_condition = condition(etag_func=categories_etag)
+
 
 class ProductListView(LoginRequiredMixin, ListView):
     """Класс для отображения списка товаров"""
     model = Product
+    paginate_by = 12
+
+    def get_filters(self):
+        """
+        Возвращает выбранные фильтры {'category': id, 'price': номер диапазона, 'owner': id или 'me'}.
+        Некорректные значения параметров запроса игнорируются.
+
+        owner=me - товары текущего пользователя: ссылка "Мои товары" не содержит id пользователя,
+        поэтому одинакова для всех пользователей, чьи страницы делят одну запись кеша страниц.
+        """
+        filters = {}
+        for name in ('category', 'price', 'owner'):
+            value = self.request.GET.get(name, '')
+            if value.isdigit():
+                filters[name] = int(value)
+        if self.request.GET.get('owner') == 'me' and self.request.user.is_authenticated:
+            filters['owner'] = 'me'
+        if filters.get('price', 0) > len(PRICE_BUCKETS):
+            del filters['price']
+        return filters
+
+    def get_owner_id(self, filters):
+        """id владельца из фильтров, owner=me заменяется на id текущего пользователя"""
+        owner = filters.get('owner')
+        return self.request.user.pk if owner == 'me' else owner
 
     def get_queryset(self, *args, **kwargs):
-        """Фильтрует товары по статусу is_active"""
+        """
+        Фильтрует товары по статусу is_active и выбранным фильтрам.
+
+        Полное описание в карточках не нужно: вместо него из базы забираются только первые
+        100 символов (short_description), а владелец сравнивается по owner_id без загрузки User.
+        """
         queryset = super().get_queryset().order_by(*args, **kwargs)
         queryset = queryset.filter(is_active=True)
+        filters = self.get_filters()
+        if 'category' in filters:
+            queryset = queryset.filter(category_id=filters['category'])
+        if 'owner' in filters:
+            queryset = queryset.filter(owner_id=self.get_owner_id(filters))
+        if 'price' in filters:
+            low, high = get_price_bucket_range(filters['price'])
+            if low is not None:
+                queryset = queryset.filter(price__gte=low)
+            if high is not None:
+                queryset = queryset.filter(price__lt=high)
+        queryset = queryset.select_related('current_version').defer('description', 'search_vector').annotate(
+            short_description=Substr('description', 1, 100))
         return queryset
 
+    def get_context_data(self, **kwargs):
+        """Добавляет счетчики фильтров и строку выбранных фильтров для ссылок пагинации"""
+        context_data = super().get_context_data(**kwargs)
+        filters = self.get_filters()
+        context_data['filters'] = filters
+        context_data['filter_query'] = urlencode(filters)
+        context_data['category_facets'], context_data['price_facets'] = get_facet_counts(
+            category_id=filters.get('category'),
+            price_bucket=filters.get('price'),
+            owner_id=self.get_owner_id(filters),
+        )
+        return context_data
 
-class ProductDetailView(LoginRequiredMixin, DetailView):
-    """Класс для отображения детальной информации о товаре"""
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Курсорная пагинация вместо OFFSET: страница выбирается по позиции (created_at, id)
+        из параметра ?cursor=, поэтому глубокие страницы обходятся так же дешево, как первая.
+        """
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        page.object_list = render_product_cards(page.object_list)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class ProductSearchView(LoginRequiredMixin, ListView):
+    """Класс для полнотекстового поиска товаров"""
     model = Product
+    template_name = 'catalog/product_search.html'
+    paginate_by = 12
 
-    def get_object(self, queryset=None):
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        """
+        Ищет активные товары по названию и описанию.
+
+        Поиск идет по столбцу search_vector (поддерживается триггером, индекс GIN), результаты
+        упорядочены по релевантности: совпадения в названии весят больше, чем в описании.
         """
-        Переопределяем метод для получения количества просмотров.
+        search_query = self.get_search_query()
+        if not search_query:
+            return Product.objects.none()
+        query = SearchQuery(search_query, config='russian', search_type='websearch')
+        queryset = Product.objects.filter(is_active=True, search_vector=query)
+        queryset = queryset.select_related('current_version').defer('description', 'search_vector').annotate(
+            short_description=Substr('description', 1, 100),
+            rank=SearchRank(F('search_vector'), query),
+        )
+        return queryset.order_by('-rank', '-id')
 
-        Получает объект Product по первичному ключу, увеличивает счетчик просмотров на 1,
-        сохраняет изменения и возвращает объект.
+    def get_context_data(self, **kwargs):
+        context_data = super().get_context_data(**kwargs)
+        context_data['object_list'] = render_product_cards(context_data['object_list'])
+        context_data['search_query'] = self.get_search_query()
+        return context_data
 
-        Parameters:
-        queryset (QuerySet, optional):
-        Набор объектов, из которого получается объект. По умолчанию None, что означает использование
-        стандартного набора объектов модели.
 
-        Returns:
-        object: Объект Product с увеличенным счетчиком просмотров.
+class ProductDetailView(LoginRequiredMixin, DetailView):
+    """Класс для отображения детальной информации о товаре"""
+    model = Product
+    queryset = Product.objects.select_related('current_version').defer('search_vector')
+
+    def get_context_data(self, **kwargs):
         """
-        self.object = super().get_object(queryset)
-        self.object.viewed += 1
-        self.object.save()
-        return self.object
+        Добавляет к сохраненному счетчику просмотров еще не перенесенные в базу.
+
+        Страница товара хранится в кеше страниц до 180 секунд (catalog/urls.py), поэтому
+        показанное количество просмотров может отставать от реального на это время.
+        """
+        context_data = super().get_context_data(**kwargs)
+        context_data['views_count'] = self.object.viewed + get_pending_product_views(self.object.pk)
+        return context_data
 
 
 class ProductCreateView(LoginRequiredMixin, CreateView):
@@ -86,7 +281,7 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
     def get_object(self, queryset=None):
         """Доступ к редактированию только у владельца"""
         self.object = super().get_object(queryset)
-        if self.request.user == self.object.owner:
+        if self.request.user.pk == self.object.owner_id:
             return self.object
         raise PermissionDenied
 
@@ -94,6 +289,18 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         """Перенаправляет на страницу с обновленным товаром"""
         return reverse('product_detail', args=[self.object.pk])
 
+    def get_formset(self):
+        """
+        Возвращает набор форм версий, созданный один раз за запрос.
+        Если метод запроса POST, форма заполняется данными из запроса, иначе - данными текущего товара.
+        """
+        if not hasattr(self, 'formset'):
+            if self.request.method == 'POST':
+                self.formset = VersionFormSet(self.request.POST, instance=self.object)
+            else:
+                self.formset = VersionFormSet(instance=self.object)
+        return self.formset
+
     def get_context_data(self, **kwargs):
         """
         Этот метод используется для предоставления контекстных данных для ProductUpdateView и включает
@@ -102,49 +309,33 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         kwargs (словарь): дополнительные ключевые аргументы, передаваемые методу.
         Возвращает:
         dict: словарь, содержащий контекстные данные для шаблона.
-        Контекстные данные включают форму для управления связанными объектами Version.
-        Если метод запроса POST, форма заполняется данными из запроса. Если метод запроса не POST,
-        форма заполняется данными из текущего объекта Product.
         """
         context_data = super().get_context_data(**kwargs)
-        VersionFormSet = inlineformset_factory(Product, Version, form=VersionForm, extra=1)
-        if self.request.method == 'POST':
-            context_data['formset'] = VersionFormSet(self.request.POST, instance=self.object)
-        else:
-            context_data['formset'] = VersionFormSet(instance=self.object)
+        context_data['formset'] = self.get_formset()
         return context_data
 
     def form_valid(self, form):
         """
-        Этот метод вызывается, когда форма и набор форм действительны. Он сохраняет данные формы и набора форм, а затем перенаправляет на успешный URL.
+        Этот метод вызывается, когда форма товара действительна. Он проверяет набор форм версий
+        (один раз за запрос), сохраняет товар и версии в одной транзакции и перенаправляет на успешный URL.
         Параметры:
         form (Form): объект формы, содержащий проверенные данные.
-        formset (InlineFormSet): объект набора форм, содержащий проверенные данные.
         Возвращает:
         HttpResponseRedirect: перенаправление на успешный URL.
         """
-        context_data = self.get_context_data()
-        formset = context_data['formset']
-        if form.is_valid() and formset.is_valid():
+        formset = self.get_formset()
+        if not formset.is_valid():
+            return self.form_invalid(form)
+        with transaction.atomic():
             self.object = form.save()
-            formset.instance = self.object
-            formset.save()
-            return super().form_valid(form)
-        else:
-            return self.render_to_response(self.get_context_data(form=form, formset=formset))
-        # """Переопределяем метод для обновления slug"""
-        # if form.is_valid():
-        #     new_product = form.save()
-        #     new_product.slug = slugify(new_product.name)
-        #     new_product.save()
-        # return super().form_valid(form)
+            save_versions(formset)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_form_class(self):
         user = self.request.user
-        if user == self.object.owner:
+        if user.pk == self.object.owner_id:
             return ProductForm
-        if (user.has_perm('catalog.can_edit_category') and user.has_perm('catalog.can_edit_description') and
-                user.has_perm('catalog.can_edit_is_active')):
+        if user.has_perms(MODERATOR_PERMISSIONS):
             return ProductModeratorForm
         raise PermissionDenied
 
@@ -203,6 +394,49 @@ def toggle_active(request, pk):
     return redirect('product_list')
 
 
+class ProductModerationView(LoginRequiredMixin, FormView):
+    """Массовая модерация: публикация, снятие с публикации и перенос в категорию товаров по фильтру"""
+    form_class = BulkModerationForm
+    template_name = 'catalog/product_moderation.html'
+
+    def dispatch(self, request, *args, **kwargs):
+        user = request.user
+        if user.is_authenticated and not (user.has_perm('catalog.can_edit_is_active') or
+                                          user.has_perm('catalog.can_edit_category')):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        """Изменяет всю выборку пачками UPDATE и показывает форму с количеством измененных товаров"""
+        updated = bulk_update_products(form.get_queryset(), **form.get_values())
+        return self.render_to_response(self.get_context_data(form=form, updated=updated))
+
+
+@login_required
+@permission_required('catalog.view_product', raise_exception=True)
+def export_products(request):
+    """
+    Выгрузка каталога для партнеров: ?format=csv|jsonl, ?gzip=1 - сжатая выгрузка.
+
+    Ответ формируется потоково, товары читаются из базы серверным курсором пачками.
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки')
+    compress = request.GET.get('gzip') == '1'
+    filename = f'catalog.{export_format}' + ('.gz' if compress else '')
+    content_type = 'application/gzip' if compress else (
+        'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8')
+    response = StreamingHttpResponse(iter_export(export_format, compress=compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class CategoryListView(LoginRequiredMixin, ListView):
     """Класс для вывода списка категорий"""
     model = Category
@@ -210,8 +444,7 @@ class CategoryListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context_data = super().get_context_data(**kwargs)
-        categories = Category.objects.all()
-        context_data['categories_list'] = categories
+        context_data['categories_list'] = context_data['object_list']
         return context_data
     #
     def get_queryset(self):
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django_redis import get_redis_connection
+
+from config.settings import CACHE_ENABLED
+
+
+def get_redis_client():
+    """
+    Клиент Redis кеша по умолчанию для команд, которых нет в API кеша Django (SADD, SPOP, INCRBY
+    в конвейере, Lua-скрипты), или None, если кеш не Redis. Ключи для него строятся через redis_key.
+    """
+    try:
+        return get_redis_connection('default')
+    except NotImplementedError:
+        return None
+
+
+def redis_key(key):
+    """Полное имя ключа в Redis с префиксом и версией кеша, как у ключей cache.get/cache.set"""
+    return caches['default'].make_and_validate_key(key)
+
+
+def get_generation_key(name):
+    """Ключ номера поколения для группы кешированных данных"""
+    return f'generation:{name}'
+
+
+def get_generation(name):
+    """Возвращает текущее поколение группы кешированных данных"""
+    return cache.get_or_set(get_generation_key(name), 1, timeout=None)
+
+
+def bump_generation(name):
+    """
+    Инвалидирует группу кешированных данных.
+
+    Старые записи не удаляются: ключи содержат номер поколения, поэтому после
+    увеличения номера они перестают читаться и вытесняются сами.
+    """
+    if not CACHE_ENABLED:
+        return
+    local_cache.delete(name)
+    key = get_generation_key(name)
+    cache.add(key, 1, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+# Размер и время жизни записей локального (внутрипроцессного) кеша
+LOCAL_CACHE_MAX_SIZE = 128
+LOCAL_CACHE_TIMEOUT = 5
+
+
+class LocalCache:
+    """
+    Ограниченный по размеру LRU-кеш в памяти процесса.
+
+    Хранит вместе со значением поколение, с которым оно было получено, и время последней
+    проверки поколения. Потокобезопасен: gunicorn с потоками обращается к нему одновременно.
+    """
+
+    def __init__(self, max_size=LOCAL_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Возвращает [generation, value, checked_at] или None"""
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is not None:
+                self._data.move_to_end(name)
+            return entry
+
+    def set(self, name, generation, value):
+        with self._lock:
+            self._data[name] = [generation, value, time.monotonic()]
+            self._data.move_to_end(name)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, name):
+        with self._lock:
+            self._data.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalCache()
+
+
+def get_local(name, load):
+    """
+    Возвращает значение группы name из памяти процесса, пока не изменилось поколение группы.
+
+    Запись в памяти отдается без обращения к Redis в течение LOCAL_CACHE_TIMEOUT секунд.
+    После этого сверяется только номер поколения (один короткий GET): если данные не менялись,
+    запись продлевается, иначе значение заново получается вызовом load(generation). Так все воркеры
+    видят изменение не позже чем через LOCAL_CACHE_TIMEOUT секунд, а процесс, изменивший данные, - сразу.
+    """
+    entry = local_cache.get(name)
+    if entry is not None and time.monotonic() - entry[2] < LOCAL_CACHE_TIMEOUT:
+        return entry[1]
+    generation = get_generation(name)
+    if entry is not None and entry[0] == generation:
+        entry[2] = time.monotonic()
+        return entry[1]
+    value = load(generation)
+    local_cache.set(name, generation, value)
+    return value
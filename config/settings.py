@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'catalog',
     'users',
@@ -128,6 +129,17 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = (
     BASE_DIR / 'static',
 )
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # collectstatic пишет файлы с хешем в имени и сжатые копии .gz/.br
+    'staticfiles': {
+        'BACKEND': 'config.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -138,6 +150,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
+# Заголовок с адресом клиента за обратным прокси (например, HTTP_X_FORWARDED_FOR) и количество
+# доверенных прокси перед приложением; без заголовка ограничение запросов использует REMOTE_ADDR
+RATE_LIMIT_IP_HEADER = os.getenv('RATE_LIMIT_IP_HEADER')
+RATE_LIMIT_PROXY_COUNT = int(os.getenv('RATE_LIMIT_PROXY_COUNT') or 1)
+
+# Пользователи и их права кешируются между запросами (users/backends.py)
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
 LOGIN_URL = '/users/login'
 
 LOGIN_REDIRECT_URL = '/'
@@ -149,15 +168,21 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', False) == 'True'
 EMAIL_USE_SSL = os.getenv('EMAIL_USE_SSL', False) == 'True'
+# Таймаут SMTP-соединения, чтобы зависший почтовый сервер не останавливал обработчик очереди писем
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT') or 10)
 
 SERVER_EMAIL = EMAIL_HOST_USER
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 CACHE_ENABLED = True
+# Внутрипроцессный кеш поверх Redis для редко меняющихся справочников (категории)
+LOCAL_CACHE_ENABLED = True
 if CACHE_ENABLED:
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'BACKEND': 'django_redis.cache.RedisCache',
             'LOCATION': os.getenv('CACHE_LOCATION'),
         }
     }
+    # Сессии читаются из кеша и записываются сквозной записью в базу данных
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
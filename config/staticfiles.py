@@ -0,0 +1,87 @@
+import gzip
+import os
+import re
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+# Расширения файлов, которые имеет смысл сжимать (изображения и шрифты уже сжаты)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml')
+# Имя файла с хешем содержимого, которое добавляет ManifestStaticFilesStorage: name.0123456789ab.ext
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+# Кодировки в порядке предпочтения: (Content-Encoding, расширение файла)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+SHORT_CACHE_CONTROL = 'public, max-age=60'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище для collectstatic: имена с хешем содержимого плюс сжатые копии .gz и .br.
+
+    Сжатые копии создаются только для текстовых файлов и только если они меньше оригинала.
+    Файл, которого нет в манифесте, - ошибка (ValueError), а не ссылка на исходное имя без хеша:
+    иначе пропущенный collectstatic обнаружится только по устаревшей статике у клиентов.
+    """
+
+    manifest_strict = True
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        variants = (
+            ('.gz', gzip.compress(content, compresslevel=9, mtime=0)),
+            ('.br', brotli.compress(content, quality=11)),
+        )
+        for extension, compressed in variants:
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            self._save(name + extension, ContentFile(compressed))
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Отдает собранную статику из STATIC_ROOT.
+
+    Если клиент поддерживает br или gzip, отдается заранее сжатая копия файла.
+    Файлы с хешем в имени кешируются браузером на год без перепроверки (immutable).
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    file_path = full_path
+    for candidate, extension in ENCODINGS:
+        if candidate in accept_encoding and os.path.isfile(full_path + extension):
+            encoding, file_path = candidate, full_path + extension
+            break
+
+    response = FileResponse(open(file_path, 'rb'), filename=os.path.basename(full_path))
+    if encoding:
+        response['Content-Encoding'] = encoding
+        response['Content-Length'] = os.path.getsize(file_path)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(path) else SHORT_CACHE_CONTROL
+    return response
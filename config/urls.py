@@ -17,10 +17,16 @@ Including another URLconf
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from config.staticfiles import serve_static
 
 urlpatterns = [
                   path('admin/', admin.site.urls),
                   path('', include('catalog.urls')),
                   path('users/', include('users.urls'))
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if not settings.DEBUG:
+    # В режиме отладки статику отдает runserver, иначе - собранные collectstatic файлы со сжатыми копиями
+    urlpatterns.append(re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static))
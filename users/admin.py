@@ -1,6 +1,31 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from users.models import User
+from catalog.pagination import EstimatedCountPaginator
+from users.models import User, OutgoingEmail
 
 
-admin.site.register(User)
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ('id', 'email', 'is_active', 'is_staff',)
+    list_filter = ('is_active', 'is_staff',)
+    search_fields = ('email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at',)
+    list_filter = ('status',)
+    search_fields = ('recipient',)
+    ordering = ('-id',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('retry',)
+
+    @admin.action(description='Отправить повторно')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=OutgoingEmail.STATUS_SENT).update(
+            status=OutgoingEmail.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f'Поставлено в очередь писем: {updated}')
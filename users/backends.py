@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from config.cache import get_generation
+from config.settings import CACHE_ENABLED
+
+PERMISSIONS_CACHE_TIMEOUT = 60 * 60
+USER_SNAPSHOT_TIMEOUT = 60 * 60
+# Поля пользователя, которые хранятся в снимке; остальные загружаются из базы при обращении
+USER_SNAPSHOT_FIELDS = ('id', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_user_snapshot_key(user_id):
+    return f'user_snapshot:{user_id}'
+
+
+def get_permissions_key(user_obj):
+    """
+    Ключ набора прав пользователя в кеше.
+
+    Поколение 'permissions' увеличивается при изменении групп и прав (users/signals.py),
+    признак суперпользователя входит в ключ, чтобы его смена не требовала сброса кеша.
+    """
+    return f'permissions:v{get_generation("permissions")}:{user_obj.pk}:{int(user_obj.is_superuser)}'
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который хранит пользователя сессии и набор его прав в общем кеше.
+
+    Стандартный бэкенд на каждом запросе выбирает пользователя из users_user, а права
+    кеширует только в экземпляре пользователя и заново собирает их из user_permissions,
+    groups и прав групп. Здесь оба результата читаются из кеша, пока не изменится
+    пользователь (сброс снимка в users/signals.py), его группы или права.
+    """
+
+    def get_user(self, user_id):
+        """
+        Восстанавливает пользователя из снимка: USER_SNAPSHOT_FIELDS и хеш для проверки сессии.
+        Остальные поля отложены и загружаются отдельным запросом только при обращении к ним.
+        """
+        if not CACHE_ENABLED:
+            return super().get_user(user_id)
+        key = get_user_snapshot_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                snapshot = [getattr(user, field) for field in USER_SNAPSHOT_FIELDS] + [user.get_session_auth_hash()]
+                cache.set(key, snapshot, timeout=USER_SNAPSHOT_TIMEOUT)
+            return user
+        *values, session_auth_hash = snapshot
+        model = get_user_model()
+        # from_db ожидает значения в порядке полей модели
+        values = dict(zip(USER_SNAPSHOT_FIELDS, values))
+        field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+        user = model.from_db('default', field_names, [values[name] for name in field_names])
+        user._session_auth_hash = session_auth_hash
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            if not CACHE_ENABLED:
+                return super().get_all_permissions(user_obj, obj)
+            key = get_permissions_key(user_obj)
+            permissions = cache.get(key)
+            if permissions is None:
+                permissions = super().get_all_permissions(user_obj, obj)
+                cache.set(key, permissions, timeout=PERMISSIONS_CACHE_TIMEOUT)
+            user_obj._perm_cache = permissions
+        return user_obj._perm_cache
@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from users.services import PURGE_BATCH_SIZE, purge_unverified_users
+
+
+class Command(BaseCommand):
+    """Удаляет пользователей, не подтвердивших email до истечения срока ссылки"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Количество токенов, обрабатываемых в одной транзакции')
+
+    def handle(self, *args, **options):
+        total = purge_unverified_users(batch_size=options['batch_size'])
+        self.stdout.write(f'Удалено неподтвержденных пользователей: {total}')
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management import BaseCommand
+
+from users.services import EMAIL_BATCH_SIZE, EMAIL_MAX_ATTEMPTS, send_pending_emails
+
+
+class Command(BaseCommand):
+    """
+    Отправляет письма из очереди OutgoingEmail.
+
+    Для проверки без настоящего почтового сервера можно запустить отладочный SMTP-сервер
+    (python -m aiosmtpd -n -l localhost:1025) и указать EMAIL_HOST=localhost, EMAIL_PORT=1025.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_BATCH_SIZE,
+                            help='Количество писем, отправляемых через одно соединение')
+        parser.add_argument('--max-attempts', type=int, default=EMAIL_MAX_ATTEMPTS,
+                            help='Количество попыток, после которого письмо считается недоставленным')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, проверяя очередь')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между проверками пустой очереди, с')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_pending_emails(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Отправлено: {sent}, с ошибкой: {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Всего отправлено: {total_sent}, с ошибкой: {total_failed}')
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:33
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_token'),
+        ('catalog', '0017_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='user_email_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:46
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Срок действия для токенов, выданных до появления срока (как EMAIL_VERIFICATION_TTL)
+LEGACY_TOKEN_TTL = timedelta(days=2)
+
+
+def move_tokens(apps, schema_editor):
+    """Переносит токены неподтвержденных пользователей из User.token в EmailVerificationToken"""
+    User = apps.get_model('users', 'User')
+    EmailVerificationToken = apps.get_model('users', 'EmailVerificationToken')
+    now = django.utils.timezone.now()
+    users = User.objects.filter(is_active=False, token__isnull=False).exclude(token='').values_list('pk', 'token')
+    EmailVerificationToken.objects.bulk_create(
+        [EmailVerificationToken(user_id=pk, token=token, created_at=now, expires_at=now + LEGACY_TOKEN_TTL)
+         for pk, token in users.iterator()],
+        batch_size=1000, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailVerificationToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64, unique=True, verbose_name='Токен')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата выдачи')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Токен подтверждения email',
+                'verbose_name_plural': 'Токены подтверждения email',
+            },
+        ),
+        migrations.RunPython(move_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='user',
+            name='token',
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 NULLABLE = {'null': True, 'blank': True}
 
@@ -13,8 +16,6 @@ class User(AbstractUser):
     avatar = models.ImageField(upload_to='users/avatar', **NULLABLE, verbose_name='Аватар', help_text='выберите аватар')
     country = models.CharField(max_length=70, **NULLABLE, verbose_name='Страна', help_text='название страны')
 
-    token = models.CharField(max_length=100, **NULLABLE, verbose_name='Token')
-
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
@@ -22,6 +23,79 @@ class User(AbstractUser):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['email']
+        indexes = [
+            # Триграммный индекс под поиск ILIKE '%...%' в админке
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='user_email_trgm_idx'),
+        ]
+
+    def get_session_auth_hash(self):
+        """Пользователь из снимка в кеше (users/backends.py) берет хеш из снимка, не загружая пароль"""
+        session_auth_hash = getattr(self, '_session_auth_hash', None)
+        if session_auth_hash is not None:
+            return session_auth_hash
+        return super().get_session_auth_hash()
+
+    def set_password(self, raw_password):
+        """Хеш из снимка после смены пароля устарел: дальше хеш считается по новому паролю"""
+        super().set_password(raw_password)
+        self._session_auth_hash = None
 
     def __str__(self):
         return f'{self.email}'
+
+
+class EmailVerificationToken(models.Model):
+    """Токен подтверждения email: выдается при регистрации, удаляется после подтверждения"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='verification_tokens',
+                             verbose_name='Пользователь')
+    token = models.CharField(max_length=64, unique=True, verbose_name='Токен')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Дата выдачи')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Действует до')
+
+    class Meta:
+        verbose_name = 'Токен подтверждения email'
+        verbose_name_plural = 'Токены подтверждения email'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.expires_at}'
+
+
+class OutgoingEmail(models.Model):
+    """
+    Исходящее письмо (transactional outbox).
+
+    Письмо сохраняется в той же транзакции, что и изменение данных, а отправляется
+    отдельным процессом (команда send_emails), поэтому медленный или недоступный SMTP-сервер
+    не задерживает запрос и не ломает уже сохраненную регистрацию.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUSES = (
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_DEAD, 'Не доставлено'),
+    )
+
+    subject = models.CharField(max_length=255, verbose_name='Тема')
+    message = models.TextField(verbose_name='Текст')
+    from_email = models.CharField(max_length=255, **NULLABLE, verbose_name='Отправитель')
+    recipient = models.EmailField(verbose_name='Получатель')
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_PENDING, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Количество попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    last_error = models.TextField(**NULLABLE, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    sent_at = models.DateTimeField(**NULLABLE, verbose_name='Дата отправки')
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            # Очередь на отправку: только ожидающие письма, в порядке времени следующей попытки
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'),
+                         name='outgoing_email_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
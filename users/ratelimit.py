@@ -0,0 +1,118 @@
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from config.cache import get_redis_client, redis_key
+
+# Атомарный token bucket: ведро на capacity запросов пополняется со скоростью rate запросов в секунду.
+# Состояние ведра (количество токенов и время последнего обновления) хранится в hash,
+# время берется с сервера Redis, чтобы не зависеть от часов веб-серверов.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+_token_bucket = None
+
+
+def _check_redis(client, key, limit, period):
+    """Проверка лимита одним вызовом Lua-скрипта в Redis (EVALSHA, при первом вызове - EVAL)"""
+    global _token_bucket
+    if _token_bucket is None:
+        _token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
+    allowed, retry_after = _token_bucket(keys=[redis_key(key)], args=[limit, limit / period], client=client)
+    return bool(allowed), float(retry_after)
+
+
+def _check_counter(key, limit, period):
+    """
+    Запасной вариант для кешей без Lua (локальный кеш в разработке и тестах):
+    счетчик запросов в окне фиксированной длины period.
+    """
+    window = int(time.time() // period)
+    key = f'{key}:{window}'
+    cache.add(key, 0, timeout=period)
+    count = cache.incr(key)
+    if count <= limit:
+        return True, 0
+    return False, (window + 1) * period - time.time()
+
+
+def check_rate_limit(name, identifier, limit, period):
+    """
+    Списывает один запрос из лимита limit запросов за period секунд для пары (name, identifier).
+
+    Возвращает (разрешено, через сколько секунд повторить).
+    """
+    digest = hashlib.md5(str(identifier).encode()).hexdigest()
+    key = f'ratelimit:{name}:{digest}'
+    client = get_redis_client()
+    if client is not None:
+        return _check_redis(client, key, limit, period)
+    return _check_counter(key, limit, period)
+
+
+def get_client_ip(request):
+    """
+    IP-адрес клиента.
+
+    За обратным прокси REMOTE_ADDR - адрес прокси, поэтому адрес клиента берется из заголовка
+    RATE_LIMIT_IP_HEADER (например, HTTP_X_FORWARDED_FOR), если он настроен. Каждый доверенный
+    прокси дописывает адрес в конец списка, поэтому берется RATE_LIMIT_PROXY_COUNT-й адрес с конца:
+    адреса левее него мог подставить сам клиент.
+    """
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header:
+        addresses = [address.strip() for address in request.META.get(header, '').split(',') if address.strip()]
+        if len(addresses) >= settings.RATE_LIMIT_PROXY_COUNT:
+            return addresses[-settings.RATE_LIMIT_PROXY_COUNT]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def rate_limit(name, limit, period, field=None, field_limit=None):
+    """
+    Декоратор представления: ограничивает POST-запросы с одного IP-адреса limit запросами за period секунд.
+    Если указано поле формы field, запросы с одним значением поля (например, email) дополнительно
+    ограничиваются field_limit запросами за period секунд, с какого бы адреса они ни приходили.
+
+    Превышение лимита отклоняется ответом 429 до обращения к базе данных и хеширования паролей.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'POST':
+                checks = [('ip', get_client_ip(request), limit)]
+                value = request.POST.get(field, '').strip().lower() if field else ''
+                if value:
+                    checks.append((field, value, field_limit or limit))
+                for kind, identifier, kind_limit in checks:
+                    allowed, retry_after = check_rate_limit(f'{name}:{kind}', identifier, kind_limit, period)
+                    if not allowed:
+                        response = HttpResponse('Слишком много запросов, повторите позже', status=429)
+                        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                        return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
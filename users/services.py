@@ -0,0 +1,140 @@
+import logging
+import secrets
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from config.settings import EMAIL_HOST_USER
+from users.models import OutgoingEmail, EmailVerificationToken, User
+
+logger = logging.getLogger(__name__)
+
+# Срок действия ссылки подтверждения email
+EMAIL_VERIFICATION_TTL = timedelta(days=2)
+PURGE_BATCH_SIZE = 500
+
+EMAIL_BATCH_SIZE = 50
+# После стольких неудачных попыток письмо помечается как недоставленное
+EMAIL_MAX_ATTEMPTS = 5
+# Задержка перед повторной попыткой: EMAIL_RETRY_DELAY * 2 ** (номер попытки - 1), не больше EMAIL_MAX_RETRY_DELAY
+EMAIL_RETRY_DELAY = 60
+EMAIL_MAX_RETRY_DELAY = 60 * 60
+# На сколько захваченное письмо скрывается от других обработчиков; должно превышать время отправки пачки
+EMAIL_LEASE_TIMEOUT = timedelta(minutes=10)
+
+
+def queue_email(subject, message, recipient, from_email=EMAIL_HOST_USER):
+    """
+    Ставит письмо в очередь на отправку.
+
+    Письмо сохраняется в текущей транзакции: если транзакция откатится, письмо не будет отправлено.
+    """
+    return OutgoingEmail.objects.create(subject=subject, message=message, recipient=recipient, from_email=from_email)
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(EMAIL_RETRY_DELAY * 2 ** (attempts - 1), EMAIL_MAX_RETRY_DELAY))
+
+
+def _mark_failed(email, error, max_attempts):
+    """Откладывает письмо до следующей попытки или помечает его недоставленным"""
+    logger.warning('Не удалось отправить письмо %s: %s', email.pk, error)
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.STATUS_DEAD
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+
+
+def claim_pending_emails(batch_size=EMAIL_BATCH_SIZE):
+    """
+    Забирает пачку ожидающих писем на отправку в короткой транзакции.
+
+    Письма блокируются SELECT ... FOR UPDATE SKIP LOCKED только на время захвата: им
+    засчитывается попытка, а следующая попытка откладывается на EMAIL_LEASE_TIMEOUT.
+    Другие обработчики их не берут, а если обработчик упадет во время отправки,
+    письма вернутся в очередь по истечении этого срока.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(OutgoingEmail.objects.select_for_update(skip_locked=True)
+                      .filter(status=OutgoingEmail.STATUS_PENDING, next_attempt_at__lte=now)
+                      .order_by('next_attempt_at')[:batch_size])
+        for email in emails:
+            email.attempts += 1
+            email.next_attempt_at = now + EMAIL_LEASE_TIMEOUT
+        OutgoingEmail.objects.bulk_update(emails, ['attempts', 'next_attempt_at'])
+    return emails
+
+
+def send_pending_emails(batch_size=EMAIL_BATCH_SIZE, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Отправляет одну пачку ожидающих писем, возвращает (отправлено, с ошибкой).
+
+    Письма захватываются claim_pending_emails, отправляются вне транзакции через одно
+    SMTP-соединение (с таймаутом EMAIL_TIMEOUT), результат записывается одним bulk_update.
+    Неудачная попытка откладывает письмо с экспоненциально растущей задержкой, после
+    max_attempts попыток письмо помечается как недоставленное. У отправленных писем текст
+    очищается, чтобы ссылки и токены из писем не хранились в базе.
+    """
+    sent = failed = 0
+    emails = claim_pending_emails(batch_size)
+    if not emails:
+        return sent, failed
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as error:
+        # Сервер недоступен: попытка не удалась для всей пачки
+        for email in emails:
+            _mark_failed(email, error, max_attempts)
+        failed = len(emails)
+    else:
+        with connection:
+            for email in emails:
+                try:
+                    EmailMessage(subject=email.subject, body=email.message, from_email=email.from_email,
+                                 to=[email.recipient], connection=connection).send()
+                except Exception as error:
+                    _mark_failed(email, error, max_attempts)
+                    failed += 1
+                else:
+                    email.status = OutgoingEmail.STATUS_SENT
+                    email.sent_at = timezone.now()
+                    email.message = ''
+                    email.last_error = None
+                    sent += 1
+    OutgoingEmail.objects.bulk_update(emails, ['status', 'next_attempt_at', 'last_error', 'sent_at', 'message'])
+    return sent, failed
+
+
+def create_verification_token(user):
+    """Выдает пользователю токен подтверждения email со сроком действия EMAIL_VERIFICATION_TTL"""
+    now = timezone.now()
+    return EmailVerificationToken.objects.create(user=user, token=secrets.token_hex(16), created_at=now,
+                                                 expires_at=now + EMAIL_VERIFICATION_TTL)
+
+
+def purge_unverified_users(batch_size=PURGE_BATCH_SIZE):
+    """
+    Удаляет учетные записи, не подтвердившие email до истечения срока токена, и просроченные
+    токены пользователей, активированных другим способом. Возвращает количество удаленных пользователей.
+
+    Просроченные токены выбираются по индексу expires_at пачками по batch_size,
+    каждая пачка обрабатывается в своей короткой транзакции, поэтому таблицы не блокируются надолго.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(EmailVerificationToken.objects.filter(expires_at__lte=timezone.now())
+                        .values_list('pk', 'user_id', 'user__is_active', 'user__last_login')[:batch_size])
+            if not rows:
+                break
+            user_pks = [user_pk for pk, user_pk, is_active, last_login in rows if not is_active and last_login is None]
+            # Токены удаляются вместе с пользователями (CASCADE), оставшиеся - отдельно
+            User.objects.filter(pk__in=user_pks).delete()
+            EmailVerificationToken.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        total += len(user_pks)
+    return total
@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from config.cache import bump_generation
+from users.backends import get_user_snapshot_key
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    """Удаляет снимок пользователя из кеша после фиксации изменения или удаления пользователя"""
+    transaction.on_commit(partial(cache.delete, get_user_snapshot_key(instance.pk)))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permissions(sender, action, **kwargs):
+    """Сбрасывает кеш прав пользователей после изменения состава групп или прав"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(partial(bump_generation, 'permissions'))
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_permissions_on_delete(sender, **kwargs):
+    """Сбрасывает кеш прав пользователей после удаления группы или права"""
+    transaction.on_commit(partial(bump_generation, 'permissions'))
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from users.backends import CachedModelBackend
+from users.models import OutgoingEmail, User
+from users.ratelimit import get_client_ip, rate_limit
+from users.services import queue_email, send_pending_emails
+
+REDIS_CACHES = {'default': {'BACKEND': 'django_redis.cache.RedisCache',
+                            'LOCATION': 'redis://localhost:6379'}}
+
+
+class RateLimitTestCase(SimpleTestCase):
+    """Ограничение запросов: выбор хранилища и адреса клиента"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = rate_limit('test', 5, 60)(lambda request: HttpResponse())
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_redis_cache_uses_token_bucket(self):
+        """С кешем Redis лимит проверяется Lua-скриптом, отказ возвращает 429 с временем пополнения ведра"""
+        with mock.patch('users.ratelimit._check_redis', return_value=(False, 1.2)) as check_redis, \
+                mock.patch('users.ratelimit._check_counter') as check_counter:
+            response = self.view(self.factory.post('/'))
+        check_redis.assert_called_once()
+        check_counter.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+    def test_field_limit_across_addresses(self):
+        """Запросы с одним email ограничиваются field_limit, с каких бы адресов они ни приходили"""
+        cache.clear()
+        view = rate_limit('test_email', 5, 60, field='email', field_limit=2)(lambda request: HttpResponse())
+        statuses = [view(self.factory.post('/', {'email': 'User@example.com'}, REMOTE_ADDR=f'10.0.0.{i}')).status_code
+                    for i in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_PROXY_COUNT=1)
+    def test_client_ip_from_trusted_proxy_header(self):
+        """За прокси адрес берется из заголовка: последний адрес, дописанный доверенным прокси"""
+        request = self.factory.post('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(get_client_ip(request), '203.0.113.7')
+
+    def test_client_ip_without_proxy_header(self):
+        request = self.factory.post('/', HTTP_X_FORWARDED_FOR='1.1.1.1', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(get_client_ip(request), '10.0.0.1')
+
+
+class CachedModelBackendTestCase(TestCase):
+    """Пользователь из снимка в кеше"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_session_auth_hash_after_set_password(self):
+        """После смены пароля хеш сессии считается по новому паролю, а не берется из снимка"""
+        user = User.objects.create(email='user@example.com')
+        user.set_password('old-password')
+        user.save()
+        backend = CachedModelBackend()
+        backend.get_user(user.pk)
+        # Второй вызов восстанавливает пользователя из снимка, записанного первым
+        cached = backend.get_user(user.pk)
+        self.assertEqual(cached._session_auth_hash, user.get_session_auth_hash())
+        cached.set_password('new-password')
+        cached.save()
+        self.assertEqual(cached.get_session_auth_hash(), User.objects.get(pk=user.pk).get_session_auth_hash())
+        self.assertNotEqual(cached.get_session_auth_hash(), user.get_session_auth_hash())
+
+
+class OutgoingEmailTestCase(TestCase):
+    """Очередь писем: отправка после фиксации транзакции и повторные попытки"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_registration_email_sent_from_queue(self):
+        """Регистрация только ставит письмо в очередь, отправляет его send_pending_emails"""
+        response = self.client.post(reverse('users:register'), {
+            'email': 'new@example.com', 'password1': 'Sx9-long-password', 'password2': 'Sx9-long-password',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(send_pending_emails(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['new@example.com'])
+        self.assertIn('/users/email-confirm/', mail.outbox[0].body)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_SENT)
+        self.assertEqual(email.message, '')
+
+    def test_rolled_back_email_not_sent(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            queue_email('Тема', 'Текст', 'user@example.com')
+            raise ValueError
+        self.assertEqual(send_pending_emails(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_failed_send_is_retried(self):
+        """Неудачная попытка откладывает письмо, следующая попытка после задержки его отправляет"""
+        queue_email('Тема', 'Текст', 'user@example.com')
+        with mock.patch('users.services.EmailMessage.send', side_effect=SMTPException('недоступен')), \
+                self.assertLogs('users.services', 'WARNING'):
+            self.assertEqual(send_pending_emails(), (0, 1))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.last_error, 'недоступен')
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        # До истечения задержки письмо не берется повторно
+        self.assertEqual(send_pending_emails(), (0, 0))
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(send_pending_emails(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_SENT)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(len(mail.outbox), 1)
@@ -4,14 +4,20 @@ from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import path
 
 from users.apps import UsersConfig
-from users.views import UserCreateView, email_verification, reset_password
+from users.ratelimit import rate_limit
+from users.views import UserCreateView, email_verification, reset_password, UserPasswordResetConfirmView
 
 app_name = UsersConfig.name
 # пути для страниц на сайте
 urlpatterns = [
-                path('login/', LoginView.as_view(template_name='login.html'), name='login'),
+                path('login/', rate_limit('login', 20, 60, field='username', field_limit=5)(
+                    LoginView.as_view(template_name='login.html')), name='login'),
                 path('logout/', LogoutView.as_view(), name='logout'),
-                path('register/', UserCreateView.as_view(), name='register'),
+                path('register/', rate_limit('register', 5, 60 * 10, field='email', field_limit=2)(
+                    UserCreateView.as_view()), name='register'),
                 path('email-confirm/<str:token>/', email_verification, name='email-confirm'),
-                path("reset_password/", reset_password, name="reset_password"),
+                path("reset_password/", rate_limit('reset_password', 5, 60 * 10, field='email', field_limit=2)(
+                    reset_password), name="reset_password"),
+                path('reset_password/<str:uidb64>/<str:token>/', rate_limit('reset_password_confirm', 10, 60 * 10)(
+                    UserPasswordResetConfirmView.as_view()), name='reset_password_confirm'),
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
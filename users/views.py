@@ -1,15 +1,16 @@
-import secrets
-import string
-import random
-
-from django.core.mail import send_mail
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.auth.views import PasswordResetConfirmView
+from django.db import transaction
+from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 from django.views.generic import CreateView
 
-from config.settings import EMAIL_HOST_USER
 from users.forms import UserRegisterForm
-from users.models import User
+from users.models import User, EmailVerificationToken
+from users.services import queue_email, create_verification_token
 
 
 class UserCreateView(CreateView):
@@ -21,49 +22,55 @@ class UserCreateView(CreateView):
     def form_valid(self, form):
         """Переопределяет метод form_valid для подтверждения почты по email"""
         if form.is_valid():
-            new_user = form.save()
-            new_user.is_active = False
-            token = secrets.token_hex(16)
-            new_user.token = token
-            new_user.save()
-            host = self.request.get_host()
-            url = f'http://{host}/users/email-confirm/{token}/'
-            send_mail(
-                subject='Подтверждение регистрации',
-                message=f'Для подтверждения регистрации перейдите по ссылке: {url}',
-                from_email=EMAIL_HOST_USER,
-                recipient_list=[new_user.email],
-                fail_silently=False,
-            )
+            with transaction.atomic():
+                new_user = form.save()
+                new_user.is_active = False
+                new_user.save()
+                token = create_verification_token(new_user).token
+                host = self.request.get_host()
+                url = f'http://{host}/users/email-confirm/{token}/'
+                # Письмо отправит команда send_emails, запрос не ждет SMTP-сервер
+                queue_email(
+                    subject='Подтверждение регистрации',
+                    message=f'Для подтверждения регистрации перейдите по ссылке: {url}',
+                    recipient=new_user.email,
+                )
             return super().form_valid(form)
 
 
 def email_verification(request, token):
-    """Подтверждает регистрацию пользователя"""
-    user = get_object_or_404(User, token=token)
-    user.is_active = True
-    user.save()
+    """Подтверждает регистрацию пользователя по действующему токену, использованный токен удаляется"""
+    verification = get_object_or_404(EmailVerificationToken.objects.select_related('user'), token=token,
+                                     expires_at__gt=timezone.now())
+    with transaction.atomic():
+        user = verification.user
+        user.is_active = True
+        user.save()
+        user.verification_tokens.all().delete()
     return redirect(reverse('users:login'))
 
 
 def reset_password(request):
-    """Сбрасывает пароль пользователя"""
-    context = {'success_message': 'Пароль успешно сброшен. Новый пароль был отправлен на ваш адрес электронной почты.'}
+    """Отправляет пользователю ссылку для установки нового пароля"""
+    context = {'success_message': 'Ссылка для сброса пароля отправлена на ваш адрес электронной почты.'}
     if request.method == 'POST':
         email = request.POST.get('email')
         user = get_object_or_404(User, email=email)
-        characters = string.ascii_letters + string.digits
-        characters_list = list(characters)
-        random.shuffle(characters_list)
-        password = ''.join(characters_list[:10])
-        user.set_password(password)
-        user.save()
-        send_mail(
+        # В очереди писем хранится одноразовая ссылка, а не пароль: токен перестает действовать после смены пароля
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = default_token_generator.make_token(user)
+        url = request.build_absolute_uri(reverse('users:reset_password_confirm', args=[uid, token]))
+        queue_email(
             subject='Восстановление пароля',
-            message=f'Здравствуйте, вы запрашивали обновление пароля. Ваш новый пароль: {password}',
-            from_email=EMAIL_HOST_USER,
-            recipient_list=[user.email],
+            message=f'Здравствуйте, вы запрашивали обновление пароля. Чтобы задать новый пароль, перейдите по ссылке: {url}',
+            recipient=user.email,
         )
         return render(request, 'users/reset_password.html', context)
     else:
         return render(request, 'users/reset_password.html')
+
+
+class UserPasswordResetConfirmView(PasswordResetConfirmView):
+    """Установка нового пароля по ссылке из письма"""
+    template_name = 'users/reset_password_confirm.html'
+    success_url = reverse_lazy('users:login')